@@ -0,0 +1,150 @@
+"""Синтетические входные данные для бенчмарков."""
+
+import uuid
+
+RULES = [
+    {
+        "id": "rule_4",
+        "condition": (
+            "Резюме должно быть заполнено на русском языке, допускаются иностранные "
+            "термины для описания профессиональных навыков и других особых случаев"
+        ),
+    },
+    {
+        "id": "rule_7",
+        "condition": (
+            "Информация не должна содержать слова и выражения, не соответствующие "
+            "нормам современного русского языка"
+        ),
+    },
+]
+
+
+def make_resume(
+    fullname: str = "Шилоносов Владимир Андреевич",
+    size: int = 1,
+    education_filenames: tuple[str, ...] = (),
+) -> dict:
+    """Строит резюме ResumeToGovernment в виде JSON-словаря.
+
+    Args:
+        fullname: ФИО кандидата (уникальное ФИО исключает попадания в кэш)
+        size: Множитель длины списков (родственники, публикации, образование...)
+        education_filenames: Идентификаторы загруженных документов; записей
+            о высшем образовании не меньше их числа
+
+    Returns:
+        dict: Резюме, пригодное для SelectionContext.resume
+    """
+    higher = [
+        {
+            "dateOfAdmission": f"{2010 + i % 10}-09-01",
+            "dateOfGraduation": f"{2014 + i % 10}-06-30",
+            "institutionName": "Санкт-Петербургский государственный университет",
+            "specialty": "09.03.04 Программная инженерия",
+            "level": "Бакалавриат",
+            "formOfEducation": "Очная",
+            "year": 4,
+            "haveDiploma": True,
+            "educationFilename": (
+                education_filenames[i] if i < len(education_filenames) else None
+            ),
+        }
+        for i in range(max(size, len(education_filenames)))
+    ]
+    return {
+        "fullname": fullname,
+        "fullnameChange": None,
+        "citizenship": "Российская Федерация",
+        "passportOrEquivalent": "45 01 №123456, выдан УФМС по г. Москве 12.05.2016",
+        "snils": "123-456 00 11",
+        "birthdate": "1998-07-22",
+        "placeOfBirth": "г. Санкт-Петербург",
+        "registrationAddress": "г. Санкт-Петербург, Невский пр., д. 12, кв. 34",
+        "actualResidenceAddress": "г. Санкт-Петербург, ул. Ленина, д. 5",
+        "contactInformation": "+7 (921) 123-45-67, vladimir@mail.ru",
+        "closeRelatives": [
+            {
+                "relationship": "Брат",
+                "fullname": f"Шилоносов Пётр Андреевич {i}",
+                "birthdate": "1995-03-14",
+                "job": "АО «Газпром», инженер",
+                "address": "г. Санкт-Петербург, ул. Ленина, д. 15, кв. 8",
+            }
+            for i in range(size)
+        ],
+        "education": {
+            "higherEducation": higher,
+            "additionalEducation": [
+                {
+                    "dateOfAdmission": "2021-01-01",
+                    "dateOfGraduation": "2021-06-01",
+                    "institutionName": "Университет ИТМО",
+                    "educationalProgram": f"Data Science и машинное обучение, модуль {i}",
+                    "programType": "Повышение квалификации",
+                    "hoursИumber": 144,
+                }
+                for i in range(size)
+            ],
+            "postgraduate": [],
+        },
+        "languges": [{"name": "Английский", "level": "SpeakFluently"}],
+        "softwareSkills": [
+            {
+                "type": "Текстовые редакторы",
+                "nameOfProduct": f"Редактор {i}",
+                "level": "Fluent",
+            }
+            for i in range(size)
+        ],
+        "publications": [
+            f"Применение машинного обучения в государственном управлении, часть {i}"
+            for i in range(size)
+        ],
+        "awards": [f"Премия губернатора за успехи в учебе {i}" for i in range(size)],
+        "militaryLiable": True,
+        "militaryСategory": "Годен к военной службе",
+        "professionalInterests": "Анализ данных, финансы, образование",
+        "additionalInfo": "Ответственный, коммуникабельный",
+        "motivation": "Хочу внести вклад в развитие Санкт-Петербурга",
+        "source": "Информация в вузе (центр карьеры, ярмарка вакансий)",
+    }
+
+
+def make_selection_context(
+    size: int = 1, education_filenames: tuple[str, ...] = ()
+) -> dict:
+    """Строит тело запроса SelectionContext с уникальным ФИО.
+
+    Args:
+        size: Множитель длины списков резюме
+        education_filenames: Идентификаторы загруженных документов
+
+    Returns:
+        dict: Тело запроса /reserve/selection
+    """
+    return {
+        "rules": RULES,
+        "resume": make_resume(
+            fullname=f"Шилоносов Владимир Андреевич {uuid.uuid4().hex[:8]}",
+            size=size,
+            education_filenames=education_filenames,
+        ),
+    }
+
+
+def unique_pdf(template: bytes) -> bytes:
+    """Делает PDF уникальным по содержимому (иной SHA-256) без порчи структуры.
+
+    Одинаковые загрузки дедуплицируются по хэшу, а результат проверки
+    документа кэшируется, поэтому без уникального содержимого повторные
+    кандидаты обходили бы сохранение файла, рендеринг и вызов VLM. Уникальный
+    PDF заставляет бенчмарк измерять полный путь обработки документа.
+
+    Args:
+        template: Исходный PDF
+
+    Returns:
+        bytes: PDF с комментарием-меткой после %%EOF
+    """
+    return template + f"\n%bench-{uuid.uuid4().hex}\n".encode()
@@ -0,0 +1,137 @@
+"""Заглушка OpenAI-совместимого chat.completions API для нагрузочных тестов.
+
+Отвечает заготовленным JSON (модерация резюме или проверка документа —
+по системному промпту) с задержкой из заданного распределения.
+
+Использование:
+    python benchmarks/llm_stub.py --port 8100 --latency-ms 800 --distribution lognormal
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MODERATION_ANSWER = {
+    "reasoning": "Резюме соответствует всем правилам. Нарушений не обнаружено.",
+    "violatedRules": [],
+}
+
+EDUCATION_ANSWER = {
+    "isHigherEducation": True,
+    "fullName": "Шилоносов Владимир Андреевич",
+    "fullNameMatches": True,
+    "code": "09.03.04",
+    "name": "Программная инженерия",
+    "degree": "Bachelor",
+    "docType": "Diploma",
+    "expectedGraduationYear": None,
+}
+
+
+def _sample_latency(args: argparse.Namespace) -> float:
+    """Возвращает задержку ответа в секундах по выбранному распределению."""
+    mean = args.latency_ms / 1000
+    if args.distribution == "constant":
+        return mean
+    if args.distribution == "uniform":
+        spread = args.jitter_ms / 1000
+        return max(0.0, random.uniform(mean - spread, mean + spread))
+    # lognormal с заданным средним: sigma задаёт тяжесть хвоста
+    return random.lognormvariate(0, args.sigma) * mean / math.exp(args.sigma**2 / 2)
+
+
+def _answer(messages: list[dict]) -> dict:
+    """Выбирает заготовленный ответ по системному промпту запроса."""
+    system = next((m.get("content") for m in messages if m.get("role") == "system"), "")
+    if isinstance(system, list):
+        system = " ".join(part.get("text", "") for part in system)
+    if "модератор резюме" in system:
+        return MODERATION_ANSWER
+    return EDUCATION_ANSWER
+
+
+def create_app(args: argparse.Namespace) -> FastAPI:
+    """Создаёт приложение заглушки.
+
+    Args:
+        args: Параметры командной строки (распределение задержки, ошибки)
+
+    Returns:
+        FastAPI: Приложение с /v1/chat/completions и /v1/models
+    """
+    app = FastAPI()
+
+    @app.get("/v1/models")
+    async def models() -> dict:
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(_sample_latency(args))
+        if random.random() < args.error_rate:
+            return JSONResponse(
+                status_code=503, content={"error": {"message": "stub overloaded"}}
+            )
+        content = json.dumps(_answer(body.get("messages", [])), ensure_ascii=False)
+        prompt_chars = len(json.dumps(body.get("messages", []), ensure_ascii=False))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": (prompt_chars + len(content)) // 4,
+            },
+        }
+
+    return app
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--distribution",
+        choices=("constant", "uniform", "lognormal"),
+        default="lognormal",
+        help="Распределение задержки ответа",
+    )
+    parser.add_argument(
+        "--latency-ms", type=float, default=800, help="Средняя задержка ответа"
+    )
+    parser.add_argument(
+        "--jitter-ms", type=float, default=200, help="Разброс для uniform"
+    )
+    parser.add_argument(
+        "--sigma", type=float, default=0.5, help="Тяжесть хвоста для lognormal"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Доля ответов 503"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    random.seed(args.seed)
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
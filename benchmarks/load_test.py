@@ -0,0 +1,256 @@
+"""Нагрузочный e2e-бенчмарк сервиса с локальной заглушкой LLM.
+
+Поднимает заглушку OpenAI-совместимого API (benchmarks/llm_stub.py) и сервис
+(main.py) с временным хранилищем, затем прогоняет сценарий «загрузка
+документов → отбор» с заданной конкурентностью и печатает пропускную
+способность и p50/p95/p99 задержек по каждому эндпоинту. Работает без сети.
+
+Использование:
+    python -m benchmarks.load_test --candidates 200 --concurrency 16
+    python -m benchmarks.load_test --documents 0 --output results.json
+    python -m benchmarks.load_test --stubs 3
+    python -m benchmarks.load_test --service-url http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.data import make_selection_context, unique_pdf
+
+UPLOAD_PATH = "/moderator/reserve/upload-education-file"
+SELECTION_PATH = "/moderator/reserve/selection"
+
+
+def _start(cmd: list[str], env: dict | None = None) -> subprocess.Popen:
+    return subprocess.Popen(
+        cmd,
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited before becoming ready: {url}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    if len(samples) == 1:
+        value = round(samples[0] * 1000, 1)
+        return {"p50": value, "p95": value, "p99": value, "max": value}
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50": round(quantiles[49] * 1000, 1),
+        "p95": round(quantiles[94] * 1000, 1),
+        "p99": round(quantiles[98] * 1000, 1),
+        "max": round(max(samples) * 1000, 1),
+    }
+
+
+async def _candidate(
+    client: httpx.AsyncClient,
+    pdf: bytes,
+    args: argparse.Namespace,
+    latencies: dict[str, list[float]],
+    errors: dict[str, int],
+) -> None:
+    """Сценарий одного кандидата: загрузка документов и отбор."""
+    filenames = []
+    for _ in range(args.documents):
+        start = time.perf_counter()
+        resp = await client.post(
+            UPLOAD_PATH,
+            files={"file": ("diploma.pdf", unique_pdf(pdf), "application/pdf")},
+        )
+        if resp.status_code != 200:
+            errors["upload"] += 1
+            return
+        latencies["upload"].append(time.perf_counter() - start)
+        filenames.append(resp.json()["educationFilename"])
+
+    start = time.perf_counter()
+    resp = await client.post(
+        SELECTION_PATH,
+        json=make_selection_context(args.resume_size, tuple(filenames)),
+    )
+    if resp.status_code != 200:
+        errors["selection"] += 1
+        return
+    latencies["selection"].append(time.perf_counter() - start)
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> dict:
+    """Прогоняет нагрузку и собирает статистику.
+
+    Args:
+        base_url: Адрес сервиса
+        args: Параметры нагрузки
+
+    Returns:
+        dict: Пропускная способность, перцентили задержек и число ошибок
+    """
+    with open(args.pdf, "rb") as f:
+        pdf = f.read()
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        timeout=args.timeout,
+        limits=httpx.Limits(max_connections=args.concurrency),
+    ) as client:
+
+        async def limited() -> None:
+            async with semaphore:
+                await _candidate(client, pdf, args, latencies, errors)
+
+        for _ in range(args.warmup):
+            await _candidate(client, pdf, args, defaultdict(list), defaultdict(int))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited() for _ in range(args.candidates)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "candidates": args.candidates,
+        "concurrency": args.concurrency,
+        "documents_per_candidate": args.documents,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies.get("selection", [])) / elapsed, 3),
+        "counts": {endpoint: len(samples) for endpoint, samples in latencies.items()},
+        "latency_ms": {
+            endpoint: _percentiles(samples) for endpoint, samples in latencies.items()
+        },
+        "errors": dict(errors),
+    }
+
+
+def _print_report(report: dict) -> None:
+    print(
+        f"candidates={report['candidates']} concurrency={report['concurrency']} "
+        f"documents={report['documents_per_candidate']} "
+        f"elapsed={report['elapsed_s']}s "
+        f"throughput={report['throughput_per_s']} selections/s"
+    )
+    print(f"{'endpoint':<12}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for endpoint, stats in report["latency_ms"].items():
+        count = report["counts"][endpoint]
+        print(
+            f"{endpoint:<12}{count:>8}{stats['p50']:>10}{stats['p95']:>10}"
+            f"{stats['p99']:>10}{stats['max']:>10}"
+        )
+    if report["errors"]:
+        print(f"errors: {report['errors']}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--documents", type=int, default=1, help="Документов на кандидата"
+    )
+    parser.add_argument(
+        "--resume-size", type=int, default=1, help="Множитель длины списков резюме"
+    )
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--pdf", default="tests/test_diploma.pdf")
+    parser.add_argument("--output", help="Сохранить отчёт в JSON для сравнения")
+    parser.add_argument(
+        "--service-url",
+        help="Использовать уже запущенный сервис вместо локального стенда",
+    )
+    parser.add_argument("--service-port", type=int, default=8091)
+    parser.add_argument("--stub-port", type=int, default=8100)
+    parser.add_argument(
+        "--stubs",
+        type=int,
+        default=1,
+        help="Число реплик заглушки на портах stub-port, stub-port+1, ... (LLM_BACKENDS)",
+    )
+    parser.add_argument(
+        "--stub-args",
+        default="--distribution lognormal --latency-ms 800",
+        help="Параметры заглушки LLM (см. benchmarks/llm_stub.py --help)",
+    )
+    return parser.parse_args(argv)
+
+
+def main() -> None:
+    args = parse_args()
+    processes = []
+    base_url = args.service_url
+    try:
+        if base_url is None:
+            storage_dir = tempfile.mkdtemp(prefix="moderator-bench-")
+            stub_urls = []
+            for port in range(args.stub_port, args.stub_port + args.stubs):
+                stub = _start(
+                    [
+                        sys.executable,
+                        "benchmarks/llm_stub.py",
+                        "--port",
+                        str(port),
+                        *args.stub_args.split(),
+                    ]
+                )
+                processes.append(stub)
+                stub_urls.append(f"http://127.0.0.1:{port}/v1")
+                _wait_ready(f"{stub_urls[-1]}/models", stub)
+
+            service = _start(
+                [sys.executable, "main.py"],
+                env={
+                    "APP_PORT": str(args.service_port),
+                    "ROOT_PATH": "",
+                    "LLM_BASE_URL": stub_urls[0],
+                    "LLM_BACKENDS": json.dumps([{"base_url": u} for u in stub_urls]),
+                    "LLM_API_KEY": "stub",
+                    "LLM_MODEL": "stub",
+                    "STORAGE_DIR": storage_dir,
+                    "RESULT_CACHE_PATH": "",
+                    "JOB_QUEUE_PATH": os.path.join(storage_dir, "jobs.sqlite3"),
+                },
+            )
+            processes.append(service)
+            base_url = f"http://127.0.0.1:{args.service_port}"
+            _wait_ready(f"{base_url}/docs", service)
+
+        report = asyncio.run(run_load(base_url, args))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Микробенчмарки CPU-горячих путей сервиса (pytest-benchmark).
+
+Запуск и сравнение с базовым замером, снятым на этой же машине на предыдущей
+сборке (замеры лежат в игнорируемом .benchmarks/):
+    uv run python -m pytest benchmarks/test_microbench.py --benchmark-save=baseline
+    uv run python -m pytest benchmarks/test_microbench.py \\
+        --benchmark-compare=0001_baseline --benchmark-compare-fail=mean:10%
+"""
+
+import base64
+import json
+import os
+
+import pytest
+
+from benchmarks.data import make_selection_context
+from configs.settings import Settings
+from routers.schemas import ResumeToGovernment, SelectionContext
+from service.llm_service import LLMService, _EducationLLMResult, _truncate_base64
+from service.resume_text_converter import ResumeTextConverter
+
+SIZES = [1, 10, 100]
+
+
+@pytest.fixture(scope="module")
+def llm_service() -> LLMService:
+    """LLMService без сети и дискового кэша (нужен только для бизнес-правил)."""
+    return LLMService(Settings(result_cache_path=""), render_service=None)
+
+
+def _llm_answer(size: int) -> str:
+    """Ответ модерации с size нарушениями, обёрнутый в think и markdown."""
+    answer = {
+        "reasoning": "Найдены нарушения правил. " * size,
+        "violatedRules": [
+            {
+                "id": f"rule_{i}",
+                "condition": "Резюме должно быть заполнено на русском языке",
+                "resume_fragment": "Ответственный, коммуникабельный " * 4,
+            }
+            for i in range(size)
+        ],
+    }
+    think = "<think>" + "Рассуждаю о правилах модерации. " * (20 * size) + "</think>"
+    return f"{think}\n```json\n{json.dumps(answer, ensure_ascii=False)}\n```"
+
+
+def _response_with_images(size: int) -> str:
+    """Текст запроса VLM c size изображениями страниц по ~100 КБ base64."""
+    image = base64.b64encode(os.urandom(75 * 1024)).decode()
+    blocks = [
+        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image}"}}
+        for _ in range(size)
+    ]
+    return json.dumps([{"type": "text", "text": "ДАННЫЕ ИЗ АНКЕТЫ"}, *blocks])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_resume_text_converter(benchmark, size):
+    resume = ResumeToGovernment.model_validate(make_selection_context(size)["resume"])
+    converter = ResumeTextConverter()
+    assert benchmark(converter.convert, resume)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_extract_json(benchmark, size):
+    text = _llm_answer(size)
+    assert benchmark(LLMService._extract_json, text).startswith("{")
+
+
+@pytest.mark.parametrize("size", [1, 3, 10])
+def test_truncate_base64(benchmark, size):
+    text = _response_with_images(size)
+    assert "<base64 truncated>" in benchmark(_truncate_base64, text)
+
+
+@pytest.mark.parametrize(
+    "result",
+    [
+        _EducationLLMResult(
+            isHigherEducation=True,
+            fullName="Шилоносов Владимир Андреевич",
+            fullNameMatches=True,
+            code="09.03.04",
+            name="Программная инженерия",
+            degree="Bachelor",
+            docType="Diploma",
+        ),
+        _EducationLLMResult(
+            isHigherEducation=True,
+            fullName="Шилоносов Владимир Андреевич",
+            fullNameMatches=True,
+            code="09.03.04",
+            name="Программная инженерия",
+            degree="Bachelor",
+            docType="Certificate",
+            expectedGraduationYear=2030,
+        ),
+        _EducationLLMResult(isHigherEducation=False),
+    ],
+    ids=["diploma", "certificate", "not_higher"],
+)
+def test_compute_resolution(benchmark, llm_service, result):
+    assert benchmark(llm_service._compute_resolution, result) is not None
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_selection_context_validation(benchmark, size):
+    payload = json.dumps(
+        make_selection_context(size, education_filenames=("a.pdf",) * size),
+        ensure_ascii=False,
+    )
+    context = benchmark(SelectionContext.model_validate_json, payload)
+    assert len(context.resume.closeRelatives) == size
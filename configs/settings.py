@@ -1,8 +1,24 @@
 from functools import lru_cache
+from typing import Optional
 
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class LLMBackendSettings(BaseModel):
+    """Реплика LLM-бэкенда из LLM_BACKENDS.
+
+    Args:
+        base_url: Base URL OpenAI-совместимого API реплики
+        api_key: API-ключ реплики (None — общий llm_api_key)
+        weight: Относительная производительность реплики
+    """
+
+    base_url: str
+    api_key: Optional[str] = None
+    weight: float = 1.0
+
+
 class Settings(BaseSettings):
     """Настройки приложения из переменных окружения / .env файла.
 
@@ -14,6 +30,62 @@ class Settings(BaseSettings):
         llm_api_key: API-ключ LLM-провайдера
         llm_model: Название модели
         llm_timeout: Таймаут запроса в секундах
+        llm_max_connections: Максимум HTTP-соединений к одной реплике LLM
+        llm_max_keepalive_connections: Максимум простаивающих keep-alive соединений к реплике
+        llm_keepalive_expiry: Время жизни простаивающего соединения в секундах
+        llm_http2: Использовать HTTP/2 к репликам LLM
+        llm_connect_timeout: Таймаут установки соединения в секундах (0 — llm_timeout)
+        llm_read_timeout: Таймаут чтения ответа в секундах (0 — llm_timeout)
+        llm_write_timeout: Таймаут отправки запроса в секундах (0 — llm_timeout)
+        llm_pool_timeout: Таймаут ожидания соединения из пула в секундах (0 — llm_timeout)
+        llm_backends: Пул реплик LLM-бэкенда (JSON); пустой — одна реплика llm_base_url
+        llm_sticky_routing: Направлять одинаковые префиксы промпта на одну реплику
+        llm_image_cost: Стоимость одного изображения в запросе относительно текстового запроса
+        llm_health_interval: Период проверки здоровья реплик в секундах (0 — отключена)
+        llm_health_timeout: Таймаут проверки здоровья реплики в секундах
+        llm_health_failures: Неудачных проверок подряд до исключения реплики из выбора
+        llm_stage_timeouts: Таймауты попытки LLM-запроса по этапам в секундах (JSON)
+        llm_max_retries: Повторов LLM-запроса после транзиентной ошибки
+        llm_retry_backoff: Базовая задержка повтора в секундах (удваивается, со случайным разбросом)
+        llm_retry_backoff_max: Максимальная задержка повтора в секундах
+        llm_hedge: Отправлять дубликат LLM-запроса, если ответа нет дольше p95 этапа
+        llm_hedge_min_delay: Минимальная задержка дубликата в секундах
+        llm_breaker_threshold: Сбоев реплики LLM подряд до размыкания её цепи (0 — не размыкать)
+        llm_breaker_reset_timeout: Время в секундах до пробного запроса после размыкания
+        llm_warmup: Прогревать префиксный кэш LLM-бэкенда в фоне при старте
+        llm_structured_output: Передавать JSON-схему ответа в response_format (guided decoding)
+        llm_repair_attempts: Попыток исправить неразобранный ответ текстовым запросом (0 — отключено)
+        max_file_size: Максимальный размер загружаемого PDF в байтах
+        upload_chunk_size: Размер блока потокового чтения загрузки в байтах
+        selection_concurrency: Максимум одновременных LLM-вызовов в рамках одного отбора
+        batch_concurrency: Максимум одновременных LLM-вызовов на весь пакетный отбор
+        batch_max_items: Максимум кандидатов в одном пакетном запросе
+        render_workers: Число процессов пула рендеринга PDF
+        render_dpi: Разрешение рендеринга страниц документа для VLM
+        render_max_long_edge: Максимальная длинная сторона страницы в пикселях (0 — без ограничения)
+        render_max_megapixels: Максимум мегапикселей на страницу (0 — без ограничения)
+        render_jpeg_quality: Качество JPEG страниц (1–95)
+        render_grayscale: Отправлять страницы в оттенках серого
+        render_max_request_bytes: Бюджет JPEG всех страниц одного запроса к VLM (0 — без ограничения)
+        page_selection_window: Сколько первых страниц оценивать при выборе страниц для VLM (0 — первые по порядку)
+        page_thumbnail_dpi: Разрешение миниатюр для оценки страниц
+        page_blank_ink_threshold: Доля «чернил», ниже которой страница без текста считается пустой
+        verification_escalation: Сначала проверять документ по первым страницам в низком разрешении
+        verification_first_dpi: Разрешение страниц первой стадии проверки документа
+        verification_first_pages: Число страниц первой стадии проверки документа
+        result_cache_max_entries: Максимум записей кэша результатов LLM в памяти
+        result_cache_ttl: Время жизни записи кэша результатов в секундах
+        result_cache_path: SQLite-файл дискового кэша результатов (пусто — только память)
+        specialty_top_k: Число специальностей-кандидатов в промпте check_education
+        specialty_min_score: Минимальная близость кандидата, ниже — полный список
+        job_queue_path: SQLite-файл очереди асинхронных заданий отбора
+        job_worker_concurrency: Максимум одновременно выполняемых заданий на воркер
+        job_poll_interval: Интервал опроса очереди в секундах
+        job_lease_timeout: Время, после которого незавершённое задание выдаётся снова
+        job_max_attempts: Максимум попыток выполнения задания
+        job_retention: Время хранения завершённых заданий в секундах
+        job_max_wait: Максимальное время long-poll ожидания результата в секундах
+        worker_metrics_port: Порт метрик Prometheus процесса-воркера (0 — отключено)
 
     Example:
         APP_PORT=8001
@@ -23,6 +95,62 @@ class Settings(BaseSettings):
         LLM_API_KEY=your-key
         LLM_MODEL=default
         LLM_TIMEOUT=120
+        LLM_MAX_CONNECTIONS=1000
+        LLM_MAX_KEEPALIVE_CONNECTIONS=100
+        LLM_KEEPALIVE_EXPIRY=5
+        LLM_HTTP2=false
+        LLM_CONNECT_TIMEOUT=5
+        LLM_READ_TIMEOUT=0
+        LLM_WRITE_TIMEOUT=0
+        LLM_POOL_TIMEOUT=0
+        LLM_BACKENDS=[{"base_url": "http://llm-1:8000/v1"}, {"base_url": "http://llm-2:8000/v1", "weight": 2}]
+        LLM_STICKY_ROUTING=true
+        LLM_IMAGE_COST=4
+        LLM_HEALTH_INTERVAL=15
+        LLM_HEALTH_TIMEOUT=5
+        LLM_HEALTH_FAILURES=3
+        LLM_STAGE_TIMEOUTS={"moderate_resume": 30, "check_education": 60}
+        LLM_MAX_RETRIES=2
+        LLM_RETRY_BACKOFF=0.5
+        LLM_RETRY_BACKOFF_MAX=8
+        LLM_HEDGE=false
+        LLM_HEDGE_MIN_DELAY=1
+        LLM_BREAKER_THRESHOLD=5
+        LLM_BREAKER_RESET_TIMEOUT=30
+        LLM_WARMUP=true
+        LLM_STRUCTURED_OUTPUT=false
+        LLM_REPAIR_ATTEMPTS=1
+        MAX_FILE_SIZE=20971520
+        UPLOAD_CHUNK_SIZE=1048576
+        SELECTION_CONCURRENCY=4
+        BATCH_CONCURRENCY=8
+        BATCH_MAX_ITEMS=1000
+        RENDER_WORKERS=2
+        RENDER_DPI=150
+        RENDER_MAX_LONG_EDGE=2000
+        RENDER_MAX_MEGAPIXELS=0
+        RENDER_JPEG_QUALITY=75
+        RENDER_GRAYSCALE=false
+        RENDER_MAX_REQUEST_BYTES=0
+        PAGE_SELECTION_WINDOW=6
+        PAGE_THUMBNAIL_DPI=24
+        PAGE_BLANK_INK_THRESHOLD=0.005
+        VERIFICATION_ESCALATION=true
+        VERIFICATION_FIRST_DPI=100
+        VERIFICATION_FIRST_PAGES=1
+        RESULT_CACHE_MAX_ENTRIES=1024
+        RESULT_CACHE_TTL=86400
+        RESULT_CACHE_PATH=storage/results.sqlite3
+        SPECIALTY_TOP_K=10
+        SPECIALTY_MIN_SCORE=0.5
+        JOB_QUEUE_PATH=storage/jobs.sqlite3
+        JOB_WORKER_CONCURRENCY=4
+        JOB_POLL_INTERVAL=0.5
+        JOB_LEASE_TIMEOUT=900
+        JOB_MAX_ATTEMPTS=3
+        JOB_RETENTION=86400
+        JOB_MAX_WAIT=60
+        WORKER_METRICS_PORT=9101
     """
 
     app_port: int = 8001
@@ -33,10 +161,72 @@ class Settings(BaseSettings):
     llm_api_key: str = ""
     llm_model: str = "default"
     llm_timeout: int = 120
+    llm_max_connections: int = 1000
+    llm_max_keepalive_connections: int = 100
+    llm_keepalive_expiry: float = 5
+    llm_http2: bool = False
+    llm_connect_timeout: float = 5
+    llm_read_timeout: float = 0
+    llm_write_timeout: float = 0
+    llm_pool_timeout: float = 0
+    llm_backends: list[LLMBackendSettings] = []
+    llm_sticky_routing: bool = True
+    llm_image_cost: float = 4
+    llm_health_interval: float = 15
+    llm_health_timeout: float = 5
+    llm_health_failures: int = 3
+    llm_stage_timeouts: dict[str, float] = {}
+    llm_max_retries: int = 2
+    llm_retry_backoff: float = 0.5
+    llm_retry_backoff_max: float = 8
+    llm_hedge: bool = False
+    llm_hedge_min_delay: float = 1
+    llm_breaker_threshold: int = 5
+    llm_breaker_reset_timeout: float = 30
+    llm_warmup: bool = True
+    llm_structured_output: bool = False
+    llm_repair_attempts: int = 1
 
     max_file_size: int = 20 * 1024 * 1024
+    upload_chunk_size: int = 1024 * 1024
     default_moderator: str = "default"
 
+    selection_concurrency: int = 4
+    batch_concurrency: int = 8
+    batch_max_items: int = 1000
+
+    render_workers: int = 2
+    render_dpi: int = 150
+    render_max_long_edge: int = 2000
+    render_max_megapixels: float = 0
+    render_jpeg_quality: int = 75
+    render_grayscale: bool = False
+    render_max_request_bytes: int = 0
+
+    page_selection_window: int = 6
+    page_thumbnail_dpi: int = 24
+    page_blank_ink_threshold: float = 0.005
+
+    verification_escalation: bool = True
+    verification_first_dpi: int = 100
+    verification_first_pages: int = 1
+
+    result_cache_max_entries: int = 1024
+    result_cache_ttl: int = 24 * 60 * 60
+    result_cache_path: str = ""
+
+    specialty_top_k: int = 10
+    specialty_min_score: float = 0.5
+
+    job_queue_path: str = "storage/jobs.sqlite3"
+    job_worker_concurrency: int = 4
+    job_poll_interval: float = 0.5
+    job_lease_timeout: int = 900
+    job_max_attempts: int = 3
+    job_retention: int = 24 * 60 * 60
+    job_max_wait: int = 60
+    worker_metrics_port: int = 0
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
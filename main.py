@@ -3,12 +3,18 @@ import signal
 from contextlib import asynccontextmanager
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from configs.settings import get_settings
 from routers.api_routers import router as moderation_router
+from routers.schemas import BusynessErrorResponse
 from service.document_service import DocumentService
+from service.job_queue import JobQueue
 from service.llm_service import LLMService
+from service.metrics import REQUESTS_IN_FLIGHT
+from service.render_service import RenderService
 from service.resume_text_converter import ResumeTextConverter
 from service.selection_service import SelectionService
 
@@ -24,6 +30,9 @@ logging.getLogger("openai").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Запас на заголовки частей multipart поверх max_file_size
+_MULTIPART_OVERHEAD = 64 * 1024
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -37,14 +46,28 @@ async def lifespan(app: FastAPI):
     """
     try:
         app.state.settings = settings
-        document_service = DocumentService(settings)
-        llm_service = LLMService(settings)
+        render_service = RenderService(settings)
+        document_service = DocumentService(settings, render_service)
+        llm_service = LLMService(settings, render_service)
         resume_text_converter = ResumeTextConverter()
         app.state.document_service = document_service
         app.state.selection_service = SelectionService(
-            document_service, llm_service, resume_text_converter
+            document_service,
+            llm_service,
+            resume_text_converter,
+            concurrency=settings.selection_concurrency,
+        )
+        app.state.job_queue = JobQueue(
+            settings.job_queue_path,
+            lease_timeout=settings.job_lease_timeout,
+            max_attempts=settings.job_max_attempts,
         )
+        llm_service.start_health_checks()
+        if settings.llm_warmup:
+            llm_service.start_warm_up()
         yield
+        await llm_service.aclose()
+        render_service.close()
 
     except Exception:
         logger.error("An error occurred during startup", exc_info=True, stack_info=True)
@@ -54,5 +77,44 @@ async def lifespan(app: FastAPI):
 app = FastAPI(lifespan=lifespan, root_path=settings.root_path)
 app.include_router(moderation_router)
 
+
+@app.middleware("http")
+async def track_in_flight(request: Request, call_next):
+    """Учитывает обрабатываемые запросы в метрике moderator_requests_in_flight."""
+    with REQUESTS_IN_FLIGHT.track_inprogress():
+        return await call_next(request)
+
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Отклоняет слишком большую загрузку по Content-Length до разбора тела.
+
+    Starlette разбирает multipart целиком до вызова обработчика, поэтому
+    проверка размера при потоковом чтении в DocumentService не прерывает
+    приём тела. Запросы без Content-Length (chunked) по-прежнему
+    принимаются целиком и отклоняются уже после разбора.
+    """
+    if request.url.path.endswith("/upload-education-file"):
+        length = request.headers.get("content-length")
+        if (
+            length is not None
+            and length.isdigit()
+            and int(length) > settings.max_file_size + _MULTIPART_OVERHEAD
+        ):
+            return JSONResponse(
+                status_code=422,
+                content=BusynessErrorResponse(
+                    message="Размер файла превышает 20 МБ"
+                ).model_dump(mode="json"),
+            )
+    return await call_next(request)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Отдаёт метрики Prometheus: этапы пайплайна, токены LLM, кэши, ошибки."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=settings.app_port)
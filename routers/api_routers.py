@@ -1,13 +1,32 @@
 import logging
+import time
+from typing import AsyncIterator, List
 
-from fastapi import APIRouter, File, HTTPException, Request, UploadFile, status
-from fastapi.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+    status,
+)
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from service.document_service import DocumentValidationError
+from service.job_queue import Job
+from service.llm_router import LLMUnavailableError
+from service.timings import StageTimings
 from routers.schemas import (
     BusynessErrorResponse,
     FinalResponse,
+    JobStatus,
+    SelectionBatchItem,
+    SelectionBatchSummary,
     SelectionContext,
+    SelectionJobResponse,
     UploadFileResponse,
 )
 
@@ -16,6 +35,26 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/moderator", tags=["Moderator"])
 
 
+def timings_requested(
+    timings: bool = Query(
+        False, description="Добавить в ответ разбивку времени по этапам"
+    ),
+    x_include_timings: bool = Header(
+        False, description="То же, что ?timings=true, заголовком"
+    ),
+) -> bool:
+    """Определяет, запросил ли клиент разбивку времени в FinalResponse.
+
+    Args:
+        timings: Query-флаг ?timings=true
+        x_include_timings: Заголовок X-Include-Timings: true
+
+    Returns:
+        bool: True, если разбивка запрошена любым из способов
+    """
+    return timings or x_include_timings
+
+
 @router.post(
     "/reserve/upload-education-file",
     summary="Загрузка PDF документа об образовании",
@@ -35,7 +74,7 @@ async def upload_education_file(request: Request, file: UploadFile = File(...)):
         request: FastAPI Request для доступа к app.state
 
     Returns:
-        UploadFileResponse: Имя сохранённого файла
+        UploadFileResponse: Идентификатор сохранённого документа
 
     Raises:
         JSONResponse 422: Если файл не является PDF, пустой или превышает 20 МБ
@@ -69,36 +108,282 @@ async def upload_education_file(request: Request, file: UploadFile = File(...)):
             "description": "Документ об образовании не найден",
         },
         500: {"description": "Внутренняя ошибка сервера"},
+        503: {
+            "model": BusynessErrorResponse,
+            "description": "LLM-сервис недоступен, повторите запрос позже",
+        },
     },
 )
-async def reserve_selection(selection_context: SelectionContext, request: Request):
+async def reserve_selection(
+    selection_context: SelectionContext,
+    request: Request,
+    include_timings: bool = Depends(timings_requested),
+):
     """Запускает полный цикл отбора кандидата в студенческий резерв.
 
     Args:
         selection_context: Контекст отбора (резюме, правила, файлы дипломов)
         request: FastAPI Request для доступа к app.state
+        include_timings: Добавить в ответ разбивку времени (?timings=true
+            или заголовок X-Include-Timings: true)
 
     Returns:
         FinalResponse: Полный результат проверки со всеми критериями отбора
 
     Raises:
         JSONResponse 422: Если файл диплома не найден
+        JSONResponse 503: Если LLM-сервис недоступен (разомкнута цепь
+            или исчерпаны повторы)
         HTTPException 500: При ошибке выполнения сервисов
 
     Example:
         POST /moderator/reserve/selection
-        Body: SelectionContext(resume=..., educationFilename="Diploma.pdf")
+        Body: SelectionContext(resume=..., educationFilename="<sha256>-<token>.pdf")
     """
     try:
-        return await request.app.state.selection_service.run(selection_context)
+        return await request.app.state.selection_service.run(
+            selection_context,
+            timings=StageTimings() if include_timings else None,
+        )
     except DocumentValidationError as e:
         return JSONResponse(
             status_code=422,
             content=BusynessErrorResponse(message=str(e)).model_dump(mode="json"),
         )
+    except LLMUnavailableError as e:
+        logger.warning("Selection rejected: %s", e)
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=BusynessErrorResponse(message=str(e)).model_dump(mode="json"),
+        )
     except Exception as e:
         logger.error("Selection pipeline failed", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e),
         )
+
+
+@router.post(
+    "/reserve/selection/batch",
+    summary="Пакетный отбор с потоковой выдачей результатов",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": (
+                "NDJSON: строка SelectionBatchItem на каждого кандидата по мере "
+                'готовности, последней строкой {"summary": SelectionBatchSummary}'
+            ),
+        },
+        422: {
+            "model": BusynessErrorResponse,
+            "description": "Пакет превышает допустимый размер",
+        },
+    },
+)
+async def reserve_selection_batch(
+    selection_contexts: List[SelectionContext],
+    request: Request,
+    include_timings: bool = Depends(timings_requested),
+):
+    """Запускает отбор для пакета кандидатов и стримит результаты в NDJSON.
+
+    LLM-вызовы всех кандидатов выполняются через общий пул на
+    batch_concurrency вызовов. Результаты отдаются по мере готовности,
+    не в порядке запроса — соответствие задаёт поле index. Ошибка одного
+    кандидата не прерывает пакет и возвращается в поле error.
+
+    Args:
+        selection_contexts: Список контекстов отбора
+        request: FastAPI Request для доступа к app.state
+        include_timings: Добавить разбивку времени в каждый FinalResponse
+
+    Returns:
+        StreamingResponse: Поток строк SelectionBatchItem и итоговая строка
+            {"summary": SelectionBatchSummary}
+
+    Raises:
+        JSONResponse 422: Если пакет больше batch_max_items
+
+    Example:
+        POST /moderator/reserve/selection/batch
+        Body: [SelectionContext(...), SelectionContext(...)]
+    """
+    settings = request.app.state.settings
+    if len(selection_contexts) > settings.batch_max_items:
+        return JSONResponse(
+            status_code=422,
+            content=BusynessErrorResponse(
+                message=(
+                    f"Размер пакета превышает {settings.batch_max_items} кандидатов"
+                )
+            ).model_dump(mode="json"),
+        )
+
+    async def stream() -> AsyncIterator[str]:
+        start_time = time.perf_counter()
+        succeeded = failed = 0
+        results = request.app.state.selection_service.run_batch(
+            selection_contexts,
+            concurrency=settings.batch_concurrency,
+            include_timings=include_timings,
+        )
+        async for index, outcome in results:
+            if isinstance(outcome, Exception):
+                failed += 1
+                item = SelectionBatchItem(
+                    index=index, completed=succeeded + failed, error=str(outcome)
+                )
+            else:
+                succeeded += 1
+                item = SelectionBatchItem(
+                    index=index, completed=succeeded + failed, result=outcome
+                )
+            yield item.model_dump_json() + "\n"
+
+        elapsed = time.perf_counter() - start_time
+        summary = SelectionBatchSummary(
+            total=len(selection_contexts),
+            succeeded=succeeded,
+            failed=failed,
+            timeMs=int(elapsed * 1000),
+            throughputPerMinute=(
+                round(len(selection_contexts) / elapsed * 60, 2) if elapsed else 0.0
+            ),
+        )
+        logger.info("Batch selection completed", extra=summary.model_dump())
+        yield '{"summary": ' + summary.model_dump_json() + "}\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _job_response(job: Job, include_timings: bool) -> SelectionJobResponse:
+    """Собирает ответ по заданию очереди.
+
+    Воркер всегда сохраняет разбивку времени, в ответ она попадает
+    только по запросу клиента.
+
+    Args:
+        job: Задание очереди
+        include_timings: Оставить разбивку времени в FinalResponse
+
+    Returns:
+        SelectionJobResponse: Статус задания и, если готов, результат отбора
+    """
+    result = None
+    if job.status == JobStatus.Done:
+        result = FinalResponse.model_validate_json(job.result)
+        if not include_timings:
+            result.timings = None
+    return SelectionJobResponse(
+        jobId=job.id, status=job.status, result=result, error=job.error
+    )
+
+
+@router.post(
+    "/reserve/selection/jobs",
+    summary="Постановка отбора в очередь асинхронных заданий",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        202: {
+            "model": SelectionJobResponse,
+            "description": "Задание поставлено в очередь",
+        },
+        422: {
+            "model": BusynessErrorResponse,
+            "description": "Документ об образовании не найден",
+        },
+    },
+)
+async def create_selection_job(
+    selection_context: SelectionContext, request: Request
+) -> SelectionJobResponse:
+    """Ставит отбор в очередь и сразу возвращает идентификатор задания.
+
+    Пайплайн выполняют процессы-воркеры (worker.py), результат забирается
+    через GET /reserve/selection/jobs/{job_id}.
+
+    Args:
+        selection_context: Контекст отбора (резюме, правила, файлы дипломов)
+        request: FastAPI Request для доступа к app.state
+
+    Returns:
+        SelectionJobResponse: Идентификатор задания в статусе Queued
+
+    Raises:
+        JSONResponse 422: Если файл диплома не найден
+
+    Example:
+        POST /moderator/reserve/selection/jobs
+        Body: SelectionContext(resume=..., educationFilename="<sha256>-<token>.pdf")
+    """
+    try:
+        await request.app.state.selection_service.check_documents(selection_context)
+    except DocumentValidationError as e:
+        return JSONResponse(
+            status_code=422,
+            content=BusynessErrorResponse(message=str(e)).model_dump(mode="json"),
+        )
+
+    job_id = await request.app.state.job_queue.enqueue(
+        selection_context.model_dump_json()
+    )
+    logger.info("Selection job enqueued", extra={"job_id": job_id})
+    return SelectionJobResponse(jobId=job_id, status=JobStatus.Queued)
+
+
+@router.get(
+    "/reserve/selection/jobs/{job_id}",
+    summary="Статус и результат асинхронного задания отбора",
+    responses={
+        200: {
+            "model": SelectionJobResponse,
+            "description": "Текущее состояние задания",
+        },
+        404: {"model": BusynessErrorResponse, "description": "Задание не найдено"},
+    },
+)
+async def get_selection_job(
+    job_id: str,
+    request: Request,
+    wait: float = Query(
+        0,
+        ge=0,
+        description="Сколько секунд ждать завершения задания (long-poll)",
+    ),
+    include_timings: bool = Depends(timings_requested),
+) -> SelectionJobResponse:
+    """Возвращает состояние задания, при wait > 0 ждёт его завершения.
+
+    Args:
+        job_id: Идентификатор задания
+        request: FastAPI Request для доступа к app.state
+        wait: Максимальное время ожидания в секундах (ограничено job_max_wait)
+        include_timings: Добавить в результат разбивку времени, включая
+            ожидание в очереди
+
+    Returns:
+        SelectionJobResponse: Статус задания; для Done — FinalResponse,
+            для Failed — текст ошибки
+
+    Raises:
+        JSONResponse 404: Если задание не найдено
+
+    Example:
+        GET /moderator/reserve/selection/jobs/<job_id>?wait=30
+    """
+    settings = request.app.state.settings
+    job = await request.app.state.job_queue.wait(
+        job_id,
+        timeout=min(wait, settings.job_max_wait),
+        poll_interval=settings.job_poll_interval,
+    )
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content=BusynessErrorResponse(
+                message=f"Задание не найдено: {job_id}"
+            ).model_dump(mode="json"),
+        )
+    return _job_response(job, include_timings)
@@ -1,7 +1,7 @@
 import json
 from datetime import date
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -174,6 +174,59 @@ class SelectionResults(BaseModel):
     overallSuccess: bool
 
 
+class EducationTiming(BaseModel):
+    """Время проверки одной записи об образовании.
+
+    Args:
+        educationFilename: Идентификатор загрузки документа
+        timeMs: Время проверки записи в миллисекундах
+        stagesMs: Длительности этапов проверки в миллисекундах
+    """
+
+    educationFilename: str
+    timeMs: int
+    stagesMs: Dict[str, int]
+
+
+class SelectionTimings(BaseModel):
+    """Разбивка времени отбора по этапам.
+
+    Args:
+        trace: Идентификатор трассировки отбора (есть в логах сервиса)
+        queueWaitMs: Ожидание в очереди заданий (только для асинхронного режима)
+        stagesMs: Суммарные длительности этапов в миллисекундах
+            (llm_slot_wait — ожидание свободного слота LLM-вызова)
+        education: Время по каждой записи об образовании
+    """
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "trace": "0b8e7c3a-5f1d-4e2a-9c6b-2d4f8a1e7b90",
+                "queueWaitMs": None,
+                "stagesMs": {
+                    "llm_slot_wait": 0,
+                    "moderate_resume": 2140,
+                    "check_education": 3050,
+                    "json_extraction": 1,
+                },
+                "education": [
+                    {
+                        "educationFilename": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08-3f2b8c1e4d5a6b7c8d9e0f1a2b3c4d5e.pdf",
+                        "timeMs": 3120,
+                        "stagesMs": {"check_education": 3050, "json_extraction": 0},
+                    }
+                ],
+            }
+        }
+    )
+
+    trace: str
+    queueWaitMs: Optional[int] = None
+    stagesMs: Dict[str, int]
+    education: List[EducationTiming]
+
+
 class FinalResponse(ResponseWithReasoning):
     """Итоговый ответ сервиса модерации резюме.
 
@@ -181,6 +234,7 @@ class FinalResponse(ResponseWithReasoning):
         educationInfo: Результаты проверки каждой записи об образовании
         result: Итоговые результаты отбора
         timeMs: Время обработки запроса в миллисекундах
+        timings: Разбивка времени по этапам (только по запросу, см. ?timings=true)
     """
 
     model_config = ConfigDict(
@@ -212,6 +266,7 @@ class FinalResponse(ResponseWithReasoning):
     educationInfo: List[EducationInfo]
     result: SelectionResults
     timeMs: int
+    timings: Optional[SelectionTimings] = None
 
 
 class UploadFileResponse(BaseModel):
@@ -219,13 +274,95 @@ class UploadFileResponse(BaseModel):
 
     Args:
         message: Сообщение о результате загрузки
-        educationFilename: Имя сохранённого файла
+        educationFilename: Идентификатор загрузки документа
     """
 
     message: str
     educationFilename: str
 
 
+class JobStatus(str, Enum):
+    """Статус асинхронного задания отбора."""
+
+    Queued = "Queued"
+    Running = "Running"
+    Done = "Done"
+    Failed = "Failed"
+
+
+class SelectionJobResponse(BaseModel):
+    """Состояние асинхронного задания отбора.
+
+    Args:
+        jobId: Идентификатор задания
+        status: Статус задания
+        result: Результат отбора (только для Done)
+        error: Текст ошибки (только для Failed)
+    """
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "jobId": "3f2b7c9e4d1a4b6f8e0c5a7d9b1e2f30",
+                "status": "Queued",
+                "result": None,
+                "error": None,
+            }
+        }
+    )
+
+    jobId: str
+    status: JobStatus
+    result: Optional[FinalResponse] = None
+    error: Optional[str] = None
+
+
+class SelectionBatchItem(BaseModel):
+    """Строка NDJSON-ответа пакетного отбора с результатом одного кандидата.
+
+    Args:
+        index: Индекс контекста в запросе
+        completed: Сколько кандидатов пакета обработано, включая этого
+        result: Результат отбора (None при ошибке)
+        error: Текст ошибки (None при успехе)
+    """
+
+    index: int
+    completed: int
+    result: Optional[FinalResponse] = None
+    error: Optional[str] = None
+
+
+class SelectionBatchSummary(BaseModel):
+    """Итоговая строка NDJSON-ответа пакетного отбора.
+
+    Args:
+        total: Число кандидатов в пакете
+        succeeded: Число успешно обработанных
+        failed: Число завершившихся ошибкой
+        timeMs: Время обработки пакета в миллисекундах
+        throughputPerMinute: Пропускная способность, кандидатов в минуту
+    """
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "total": 100,
+                "succeeded": 99,
+                "failed": 1,
+                "timeMs": 184000,
+                "throughputPerMinute": 32.6,
+            }
+        }
+    )
+
+    total: int
+    succeeded: int
+    failed: int
+    timeMs: int
+    throughputPerMinute: float
+
+
 class BusynessErrorResponse(BaseModel):
     """Ответ с описанием бизнес-ошибки.
 
@@ -311,7 +448,9 @@ class HigherEducation(Education):
     year: int = Field(..., description="Курс или год обучения", example=4)
     haveDiploma: bool = Field(..., description="Наличие диплома", example=True)
     educationFilename: Optional[str] = Field(
-        None, description="Имя файла документа об образовании", example="Diploma.pdf"
+        None,
+        description="Идентификатор документа об образовании из ответа на загрузку",
+        example="9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08-3f2b8c1e4d5a6b7c8d9e0f1a2b3c4d5e.pdf",
     )
 
 
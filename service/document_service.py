@@ -1,11 +1,16 @@
 import asyncio
+import hashlib
 import logging
 import os
 
 from fastapi import UploadFile
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path
 
 from configs.settings import Settings
+from service.document_store import DocumentStore
+from service.metrics import PDF_VALIDATIONS, track_stage
+from service.pdf_validator import PdfCheckStatus, validate_pdf
+from service.render_service import RenderService
 
 logger = logging.getLogger(__name__)
 
@@ -17,19 +22,38 @@ class DocumentValidationError(ValueError):
 class DocumentService:
     """Сервис загрузки и хранения документов.
 
-    Валидирует и сохраняет PDF-файлы на диск.
+    Валидирует и сохраняет PDF-файлы в content-addressed хранилище.
+    Загрузка читается потоково блоками фиксированного размера во временный
+    файл: сигнатура PDF проверяется по первому блоку, превышение
+    max_file_size прерывает чтение сразу. Тело multipart к этому моменту
+    уже принято Starlette; до его разбора загрузка ограничивается только
+    по Content-Length в main.py. Структура PDF проверяется
+    без рендеринга в отдельном потоке, не блокируя event loop; рендеринг первой страницы выполняется только
+    если структурная проверка не дала однозначного ответа. Повторная загрузка уже известного содержимого не валидируется и не
+    записывается заново. После сохранения страницы документа рендерятся
+    в фоне, чтобы не тратить время на этапе отбора.
+
+    Каждая загрузка получает собственный идентификатор, который возвращает
+    save_pdf. Одинаковые файлы разных загрузок делят один документ;
+    delete освобождает только свою загрузку, а файл удаляется вместе
+    с последней ссылкой на него.
 
     Args:
-        settings: Настройки приложения (storage_dir, max_file_size)
+        settings: Настройки приложения (storage_dir, max_file_size, upload_chunk_size)
+        render_service: Сервис рендеринга страниц PDF
 
     Example:
-        service = DocumentService(settings)
-        await service.save_pdf(file)  # raises DocumentValidationError on failure
+        service = DocumentService(settings, render_service)
+        upload_id = await service.save_pdf(file)  # raises DocumentValidationError
+        ...
+        service.delete(upload_id)
     """
 
-    def __init__(self, settings: Settings) -> None:
-        self._storage_dir = settings.storage_dir
+    def __init__(self, settings: Settings, render_service: RenderService) -> None:
+        self._store = DocumentStore(settings.storage_dir)
         self._max_file_size = settings.max_file_size
+        self._chunk_size = settings.upload_chunk_size
+        self._render_service = render_service
 
     async def save_pdf(self, file: UploadFile) -> str:
         """Валидирует и сохраняет PDF-файл.
@@ -38,7 +62,7 @@ class DocumentService:
             file: Загружаемый файл
 
         Returns:
-            str: Имя сохранённого файла
+            str: Идентификатор загрузки "<sha256>-<token>.pdf"
 
         Raises:
             DocumentValidationError: Если файл не прошёл валидацию
@@ -48,65 +72,165 @@ class DocumentService:
         if not file.filename.lower().endswith(".pdf"):
             raise DocumentValidationError("Разрешены только PDF файлы")
 
-        logger.debug("save_pdf: reading file bytes")
-        file_bytes = await file.read()
-        logger.debug("save_pdf: read %d bytes", len(file_bytes))
+        tmp_path = self._store.temp_path()
+        try:
+            with track_stage("upload_read"):
+                document_id = await self._receive(file, tmp_path)
+
+            # ссылка регистрируется до записи файла, чтобы параллельный
+            # delete другой загрузки того же документа не удалил его
+            upload_id = self._store.upload_id(document_id)
+            if await self._store.add_upload(upload_id, document_id):
+                self._render_service.prerender(self._store.path(document_id))
+                logger.info("PDF already stored", extra={"doc_filename": upload_id})
+                return upload_id
+
+            try:
+                await self._validate(tmp_path)
+                file_path = await asyncio.to_thread(
+                    self._store.put_file, document_id, tmp_path
+                )
+            except BaseException:
+                await self._store.release(upload_id)
+                raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._render_service.prerender(file_path)
+
+        logger.info("PDF saved", extra={"doc_filename": upload_id})
+        return upload_id
+
+    async def _validate(self, path: str) -> None:
+        """Проверяет, что файл является пригодным PDF.
+
+        Сначала выполняется структурная проверка (trailer, xref, дерево
+        страниц, шифрование). Только при неоднозначном результате первая
+        страница рендерится через poppler.
 
-        if len(file_bytes) == 0:
-            raise DocumentValidationError("Файл пустой")
+        Args:
+            path: Путь к файлу
+
+        Raises:
+            DocumentValidationError: Если файл не является валидным PDF
+        """
+        with track_stage("pdf_validation"):
+            check = await asyncio.to_thread(validate_pdf, path)
+        PDF_VALIDATIONS.labels(result=check.status.value).inc()
+        logger.debug("save_pdf: structural check %s", check)
+
+        if check.status == PdfCheckStatus.Valid:
+            return
+        if check.status == PdfCheckStatus.Invalid:
+            raise DocumentValidationError(
+                f"Файл не является валидным PDF документом, {check.reason}"
+            )
 
-        if len(file_bytes) > self._max_file_size:
-            raise DocumentValidationError("Размер файла превышает 20 МБ")
-        logger.debug("save_pdf: calling convert_from_bytes")
+        logger.debug("save_pdf: structural check inconclusive, rendering page 1")
         try:
             await asyncio.to_thread(
-                convert_from_bytes, file_bytes, dpi=50, first_page=1, last_page=1
+                convert_from_path, path, dpi=50, first_page=1, last_page=1
             )
         except Exception as e:
             raise DocumentValidationError(
                 f"Файл не является валидным PDF документом, {e}"
             )
-        logger.debug("save_pdf: convert_from_bytes done")
 
-        os.makedirs(self._storage_dir, exist_ok=True)
-        file_path = os.path.join(self._storage_dir, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
+    async def _receive(self, file: UploadFile, tmp_path: str) -> str:
+        """Потоково пишет загрузку во временный файл.
+
+        Память на одну загрузку ограничена размером блока. К этому моменту
+        Starlette уже принял тело запроса целиком, поэтому превышение
+        max_file_size здесь не экономит приём: большие загрузки отклоняются
+        раньше по Content-Length (middleware limit_upload_size в main.py),
+        а эта проверка остаётся для запросов без него.
 
-        logger.info("PDF saved", extra={"doc_filename": file.filename})
-        return file.filename
+        Args:
+            file: Загружаемый файл
+            tmp_path: Путь к временному файлу
 
-    def exists(self, filename: str) -> bool:
+        Returns:
+            str: Идентификатор документа (по SHA-256 содержимого)
+
+        Raises:
+            DocumentValidationError: Если файл пустой, не начинается с
+                сигнатуры PDF или превышает max_file_size
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with open(tmp_path, "wb") as f:
+            while chunk := await file.read(self._chunk_size):
+                if size == 0 and b"%PDF-" not in chunk[:1024]:
+                    raise DocumentValidationError(
+                        "Файл не является валидным PDF документом"
+                    )
+                size += len(chunk)
+                if size > self._max_file_size:
+                    raise DocumentValidationError("Размер файла превышает 20 МБ")
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        logger.debug("save_pdf: received %d bytes", size)
+
+        if size == 0:
+            raise DocumentValidationError("Файл пустой")
+        return self._store.document_id(digest.hexdigest())
+
+    async def exists(self, filename: str) -> bool:
         """Проверяет наличие файла в хранилище.
 
         Args:
-            filename: Имя файла
+            filename: Идентификатор загрузки
 
         Returns:
             bool: True если файл существует
         """
-        return os.path.exists(os.path.join(self._storage_dir, filename))
+        document_id = await self._store.resolve(filename)
+        return document_id is not None and self._store.contains(document_id)
+
+    async def delete(self, filename: str) -> None:
+        """Освобождает загрузку документа.
 
-    def delete(self, filename: str) -> None:
-        """Удаляет файл из хранилища.
+        Файл и его предрендеренные страницы удаляются, только если на
+        документ не ссылается ни одна другая загрузка.
 
         Args:
-            filename: Имя файла
+            filename: Идентификатор загрузки
         """
-        path = os.path.join(self._storage_dir, filename)
-        try:
-            os.remove(path)
-            logger.info("PDF deleted", extra={"doc_filename": filename})
-        except FileNotFoundError:
+        document_id = await self._store.resolve(filename)
+        if document_id is None:
             logger.warning("PDF not found on delete", extra={"doc_filename": filename})
+            return
+        if await self._store.release(filename):
+            self._render_service.discard(self._store.path(document_id))
+            logger.info("PDF deleted", extra={"doc_filename": document_id})
+        else:
+            logger.info("PDF upload released", extra={"doc_filename": filename})
+
+    async def resolve(self, filename: str) -> str:
+        """Возвращает идентификатор документа (хэш содержимого).
+
+        Args:
+            filename: Идентификатор загрузки
+
+        Returns:
+            str: Идентификатор документа
+
+        Raises:
+            DocumentValidationError: Если документ не найден
+        """
+        document_id = await self._store.resolve(filename)
+        if document_id is None:
+            raise DocumentValidationError(f"Файл диплома не найден: {filename}")
+        return document_id
 
-    def get_path(self, filename: str) -> str:
-        """Возвращает полный путь к файлу в хранилище.
+    def path(self, document_id: str) -> str:
+        """Возвращает путь к файлу по идентификатору документа из resolve.
 
         Args:
-            filename: Имя файла
+            document_id: Идентификатор документа
 
         Returns:
-            str: Абсолютный путь к файлу
+            str: Путь к файлу
         """
-        return os.path.join(self._storage_dir, filename)
+        return self._store.path(document_id)
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import uuid
+from contextlib import closing
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_UPLOAD_ID_RE = re.compile(r"^([0-9a-f]{64})-[0-9a-f]{32}\.pdf$")
+
+
+class DocumentStore:
+    """Content-addressed хранилище PDF-документов со счётчиком ссылок.
+
+    Документ хранится по SHA-256 содержимого в поддиректориях по префиксу
+    хэша (storage_dir/ab/cd/<sha256>.pdf), идентификатор документа —
+    "<sha256>.pdf". Каждая загрузка получает собственный идентификатор
+    "<sha256>-<token>.pdf", который ссылается на документ из SQLite-таблицы:
+    одинаковые файлы разных кандидатов делят один документ, но не ссылку.
+    Файл удаляется, только когда освобождена последняя ссылка на него.
+    Добавление и освобождение ссылок выполняются в транзакции
+    BEGIN IMMEDIATE, поэтому согласованы и между процессами; обращения
+    к SQLite и удаление файлов выполняются в потоке, вне event loop.
+    Документ адресуется только идентификатором загрузки.
+
+    Args:
+        storage_dir: Корневая директория хранилища
+
+    Example:
+        store = DocumentStore("storage")
+        tmp_path = store.temp_path()  # сюда записывается загрузка
+        document_id = store.document_id(hashlib.sha256(content).hexdigest())
+        upload_id = store.upload_id(document_id)
+        if not await store.add_upload(upload_id, document_id):
+            store.put_file(document_id, tmp_path)
+        ...
+        await store.release(upload_id)  # удаляет файл, если ссылок не осталось
+    """
+
+    def __init__(self, storage_dir: str) -> None:
+        self._storage_dir = storage_dir
+        self._db_path = os.path.join(storage_dir, "aliases.sqlite3")
+        self._tmp_dir = os.path.join(storage_dir, "tmp")
+        os.makedirs(self._tmp_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                "upload_id TEXT PRIMARY KEY, document_id TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_document_id "
+                "ON uploads (document_id)"
+            )
+
+    @staticmethod
+    def document_id(sha256_hex: str) -> str:
+        """Строит идентификатор документа по хэшу содержимого.
+
+        Args:
+            sha256_hex: SHA-256 содержимого в hex
+
+        Returns:
+            str: Идентификатор вида "<sha256>.pdf"
+        """
+        return f"{sha256_hex}.pdf"
+
+    @staticmethod
+    def upload_id(document_id: str) -> str:
+        """Создаёт новый идентификатор загрузки документа.
+
+        Args:
+            document_id: Идентификатор документа
+
+        Returns:
+            str: Идентификатор вида "<sha256>-<token>.pdf"
+        """
+        return f"{document_id.removesuffix('.pdf')}-{uuid.uuid4().hex}.pdf"
+
+    def temp_path(self) -> str:
+        """Возвращает уникальный путь для временного файла загрузки.
+
+        Временные файлы лежат на той же файловой системе, что и хранилище,
+        поэтому put_file переносит их атомарным переименованием.
+
+        Returns:
+            str: Путь к временному файлу
+        """
+        return os.path.join(self._tmp_dir, f"{uuid.uuid4().hex}.part")
+
+    def path(self, document_id: str) -> str:
+        """Возвращает путь к документу в шардированном хранилище.
+
+        Args:
+            document_id: Идентификатор документа
+
+        Returns:
+            str: Путь к файлу документа
+        """
+        return os.path.join(
+            self._storage_dir, document_id[:2], document_id[2:4], document_id
+        )
+
+    def contains(self, document_id: str) -> bool:
+        """Проверяет наличие документа в хранилище.
+
+        Args:
+            document_id: Идентификатор документа
+
+        Returns:
+            bool: True если документ сохранён
+        """
+        return os.path.exists(self.path(document_id))
+
+    def put_file(self, document_id: str, tmp_path: str) -> str:
+        """Атомарно переносит временный файл в хранилище.
+
+        Args:
+            document_id: Идентификатор документа
+            tmp_path: Путь к временному файлу из temp_path
+
+        Returns:
+            str: Путь к сохранённому файлу
+        """
+        path = self.path(document_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return path
+
+    async def add_upload(self, upload_id: str, document_id: str) -> bool:
+        """Регистрирует ссылку загрузки на документ.
+
+        Ссылка добавляется до записи файла: параллельный release той же
+        ссылки на документ увидит её и не удалит файл.
+
+        Args:
+            upload_id: Идентификатор загрузки из upload_id
+            document_id: Идентификатор документа
+
+        Returns:
+            bool: True если файл документа уже сохранён
+        """
+        return await asyncio.to_thread(self._add_upload, upload_id, document_id)
+
+    async def release(self, upload_id: str) -> bool:
+        """Освобождает ссылку и удаляет документ, если ссылок не осталось.
+
+        Args:
+            upload_id: Идентификатор загрузки
+
+        Returns:
+            bool: True если файл документа был удалён
+        """
+        return await asyncio.to_thread(self._release, upload_id)
+
+    async def resolve(self, upload_id: str) -> Optional[str]:
+        """Находит идентификатор документа по ссылке загрузки.
+
+        Принимаются только идентификаторы загрузок: по хэшу содержимого
+        документ не адресуется, чтобы знающий хэш не мог использовать
+        чужую загрузку.
+
+        Args:
+            upload_id: Идентификатор загрузки
+
+        Returns:
+            Optional[str]: Идентификатор документа или None, если ссылка
+                неизвестна или уже освобождена
+        """
+        if not _UPLOAD_ID_RE.match(upload_id):
+            return None
+        return await asyncio.to_thread(self._resolve, upload_id)
+
+    def _add_upload(self, upload_id: str, document_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO uploads (upload_id, document_id) VALUES (?, ?)",
+                    (upload_id, document_id),
+                )
+                stored = self.contains(document_id)
+                conn.execute("COMMIT")
+                return stored
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _release(self, upload_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT document_id FROM uploads WHERE upload_id = ?",
+                    (upload_id,),
+                ).fetchone()
+                removed = False
+                if row is not None:
+                    (document_id,) = row
+                    conn.execute(
+                        "DELETE FROM uploads WHERE upload_id = ?", (upload_id,)
+                    )
+                    (refs,) = conn.execute(
+                        "SELECT COUNT(*) FROM uploads WHERE document_id = ?",
+                        (document_id,),
+                    ).fetchone()
+                    if refs == 0:
+                        # файл удаляется под блокировкой, чтобы add_upload не
+                        # увидел его перед удалением
+                        try:
+                            os.remove(self.path(document_id))
+                            removed = True
+                        except FileNotFoundError:
+                            pass
+                conn.execute("COMMIT")
+                return removed
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _resolve(self, upload_id: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT document_id FROM uploads WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
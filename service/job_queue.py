@@ -0,0 +1,273 @@
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import NamedTuple, Optional
+
+from routers.schemas import JobStatus
+
+
+class Job(NamedTuple):
+    """Задание очереди отбора.
+
+    Args:
+        id: Идентификатор задания
+        status: Статус задания
+        payload: SelectionContext в JSON
+        result: FinalResponse в JSON (для Done)
+        error: Текст ошибки (для Failed)
+        created_at: Время постановки в очередь (unix time)
+        started_at: Время взятия в работу (unix time)
+        finished_at: Время завершения (unix time)
+        attempts: Номер попытки выполнения (метка владения заданием)
+    """
+
+    id: str
+    status: JobStatus
+    payload: str
+    result: Optional[str]
+    error: Optional[str]
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    attempts: int = 0
+
+
+_COLUMNS = (
+    "id, status, payload, result, error, created_at, started_at, finished_at, "
+    "attempts"
+)
+
+
+class JobQueue:
+    """Durable-очередь заданий отбора на SQLite.
+
+    API-процессы ставят задания в очередь, процессы-воркеры забирают их
+    атомарно (BEGIN IMMEDIATE), поэтому несколько воркеров могут разбирать
+    одну очередь. Задание, которое воркер не завершил за lease_timeout
+    (например, процесс упал), снова выдаётся другому воркеру, пока не
+    исчерпано max_attempts. Если первый воркер всё же жив, задание
+    выполняется дважды, но сохраняется только результат последней
+    выдачи: complete/fail применяются, лишь пока номер попытки совпадает.
+
+    Args:
+        db_path: Путь к SQLite-файлу очереди
+        lease_timeout: Время в секундах, после которого незавершённое
+            задание снова становится доступным
+        max_attempts: Максимум попыток выполнения задания
+
+    Example:
+        queue = JobQueue("storage/jobs.sqlite3")
+        job_id = await queue.enqueue(context.model_dump_json())
+        job = await queue.claim()
+        await queue.complete(job, response.model_dump_json())
+    """
+
+    def __init__(
+        self, db_path: str, lease_timeout: float = 900, max_attempts: int = 3
+    ) -> None:
+        self._db_path = db_path
+        self._lease_timeout = lease_timeout
+        self._max_attempts = max_attempts
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, payload TEXT NOT NULL, "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_created "
+                "ON jobs (status, created_at)"
+            )
+
+    async def enqueue(self, payload: str) -> str:
+        """Ставит задание в очередь.
+
+        Args:
+            payload: SelectionContext в JSON
+
+        Returns:
+            str: Идентификатор задания
+        """
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._insert, job_id, payload)
+        return job_id
+
+    async def claim(self) -> Optional[Job]:
+        """Атомарно забирает самое старое доступное задание.
+
+        Returns:
+            Optional[Job]: Задание или None, если очередь пуста
+        """
+        return await asyncio.to_thread(self._claim)
+
+    async def complete(self, job: Job, result: str) -> bool:
+        """Сохраняет результат выполненного задания.
+
+        Args:
+            job: Задание, полученное из claim
+            result: FinalResponse в JSON
+
+        Returns:
+            bool: False, если задание уже перевыдано другому воркеру
+                и результат не сохранён
+        """
+        return await asyncio.to_thread(self._finish, job, JobStatus.Done, result, None)
+
+    async def fail(self, job: Job, error: str) -> bool:
+        """Помечает задание как завершившееся ошибкой.
+
+        Args:
+            job: Задание, полученное из claim
+            error: Текст ошибки
+
+        Returns:
+            bool: False, если задание уже перевыдано другому воркеру
+                и ошибка не сохранена
+        """
+        return await asyncio.to_thread(self._finish, job, JobStatus.Failed, None, error)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """Возвращает задание по идентификатору.
+
+        Args:
+            job_id: Идентификатор задания
+
+        Returns:
+            Optional[Job]: Задание или None, если не найдено
+        """
+        return await asyncio.to_thread(self._select, job_id)
+
+    async def wait(
+        self, job_id: str, timeout: float, poll_interval: float
+    ) -> Optional[Job]:
+        """Ждёт завершения задания не дольше timeout (long-poll).
+
+        Args:
+            job_id: Идентификатор задания
+            timeout: Максимальное время ожидания в секундах
+            poll_interval: Интервал опроса очереди в секундах
+
+        Returns:
+            Optional[Job]: Задание в последнем известном статусе или None
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await self.get(job_id)
+            if job is None or job.status in (JobStatus.Done, JobStatus.Failed):
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            await asyncio.sleep(min(poll_interval, remaining))
+
+    async def purge(self, older_than: float) -> int:
+        """Удаляет завершённые задания старше older_than секунд.
+
+        Args:
+            older_than: Возраст завершённого задания в секундах
+
+        Returns:
+            int: Число удалённых заданий
+        """
+        return await asyncio.to_thread(self._purge, time.time() - older_than)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=30, isolation_level=None)
+
+    def _insert(self, job_id: str, payload: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (job_id, JobStatus.Queued.value, payload, time.time()),
+            )
+
+    def _claim(self) -> Optional[Job]:
+        now = time.time()
+        stale = now - self._lease_timeout
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE status = ? AND started_at < ? AND attempts >= ?",
+                    (
+                        JobStatus.Failed.value,
+                        "Превышено число попыток выполнения задания",
+                        now,
+                        JobStatus.Running.value,
+                        stale,
+                        self._max_attempts,
+                    ),
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs "
+                    "WHERE status = ? OR (status = ? AND started_at < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (JobStatus.Queued.value, JobStatus.Running.value, stale),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (JobStatus.Running.value, now, row[0]),
+                )
+                job = self._fetch(conn, row[0])
+                conn.execute("COMMIT")
+                return job
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _finish(
+        self,
+        job: Job,
+        status: JobStatus,
+        result: Optional[str],
+        error: Optional[str],
+    ) -> bool:
+        with closing(self._connect()) as conn:
+            return (
+                conn.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, "
+                    "finished_at = ? WHERE id = ? AND status = ? AND attempts = ?",
+                    (
+                        status.value,
+                        result,
+                        error,
+                        time.time(),
+                        job.id,
+                        JobStatus.Running.value,
+                        job.attempts,
+                    ),
+                ).rowcount
+                == 1
+            )
+
+    def _select(self, job_id: str) -> Optional[Job]:
+        with closing(self._connect()) as conn:
+            return self._fetch(conn, job_id)
+
+    def _purge(self, before: float) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (JobStatus.Done.value, JobStatus.Failed.value, before),
+            ).rowcount
+
+    @staticmethod
+    def _fetch(conn: sqlite3.Connection, job_id: str) -> Optional[Job]:
+        row = conn.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return Job(row[0], JobStatus(row[1]), *row[2:])
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+
+from routers.schemas import SelectionContext
+from service.document_service import DocumentValidationError
+from service.job_queue import Job, JobQueue
+from service.metrics import STAGE_SECONDS
+from service.timings import StageTimings
+from service.selection_service import SelectionService
+
+logger = logging.getLogger(__name__)
+
+_PURGE_INTERVAL = 60
+
+
+class JobWorker:
+    """Воркер, разбирающий очередь заданий отбора.
+
+    Забирает задания из JobQueue и выполняет их через SelectionService,
+    не более concurrency заданий одновременно. Воркеры масштабируются
+    независимо от API: достаточно запустить больше процессов worker.py
+    с общей очередью и хранилищем документов.
+
+    Args:
+        queue: Очередь заданий
+        selection_service: Оркестратор пайплайна отбора
+        concurrency: Максимум одновременно выполняемых заданий
+        poll_interval: Пауза между опросами пустой очереди в секундах
+        retention: Время хранения завершённых заданий в секундах
+
+    Example:
+        worker = JobWorker(queue, selection_service, concurrency=4)
+        await worker.run()
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        selection_service: SelectionService,
+        concurrency: int = 4,
+        poll_interval: float = 0.5,
+        retention: float = 24 * 60 * 60,
+    ) -> None:
+        self._queue = queue
+        self._selection_service = selection_service
+        self._concurrency = max(1, concurrency)
+        self._poll_interval = poll_interval
+        self._retention = retention
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Прекращает забирать новые задания; текущие будут доведены до конца."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        """Разбирает очередь до вызова stop()."""
+        semaphore = asyncio.Semaphore(self._concurrency)
+        tasks: set[asyncio.Task] = set()
+        purged_at = 0.0
+        logger.info("Job worker started", extra={"concurrency": self._concurrency})
+
+        while not self._stopping.is_set():
+            if time.monotonic() - purged_at > _PURGE_INTERVAL:
+                try:
+                    await self._queue.purge(self._retention)
+                except Exception:
+                    logger.warning("Job purge failed", exc_info=True)
+                purged_at = time.monotonic()
+
+            await semaphore.acquire()
+            if self._stopping.is_set():
+                # stop() пришёл, пока ждали свободного слота
+                semaphore.release()
+                break
+            try:
+                job = await self._queue.claim()
+            except Exception:
+                # например, database is locked — воркер не должен падать
+                semaphore.release()
+                logger.warning("Job claim failed", exc_info=True)
+                await self._sleep()
+                continue
+            if job is None:
+                semaphore.release()
+                await self._sleep()
+                continue
+
+            task = asyncio.create_task(self._process(job, semaphore))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        logger.info("Job worker stopped")
+
+    async def _sleep(self) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), self._poll_interval)
+        except TimeoutError:
+            pass
+
+    async def _process(self, job: Job, semaphore: asyncio.Semaphore) -> None:
+        """Выполняет одно задание и сохраняет результат или ошибку.
+
+        Args:
+            job: Задание очереди
+            semaphore: Семафор, ограничивающий число одновременных заданий
+        """
+        try:
+            queue_wait = job.started_at - job.created_at
+            STAGE_SECONDS.labels(stage="queue_wait").observe(queue_wait)
+            logger.info(
+                "Job started",
+                extra={"job_id": job.id, "queue_wait_ms": int(queue_wait * 1000)},
+            )
+            context = SelectionContext.model_validate_json(job.payload)
+            response = await self._selection_service.run(
+                context, timings=StageTimings(queue_wait=queue_wait)
+            )
+            if await self._queue.complete(job, response.model_dump_json()):
+                logger.info("Job done", extra={"job_id": job.id})
+            else:
+                logger.warning(
+                    "Job lease lost, result dropped", extra={"job_id": job.id}
+                )
+        except DocumentValidationError as e:
+            await self._queue.fail(job, str(e))
+            logger.info("Job rejected", extra={"job_id": job.id, "error": str(e)})
+        except Exception as e:
+            logger.error("Job failed", exc_info=True, extra={"job_id": job.id})
+            await self._queue.fail(job, str(e))
+        finally:
+            semaphore.release()
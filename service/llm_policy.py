@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+
+from service.llm_router import LLMBackend, LLMRouter, LLMUnavailableError
+from service.metrics import LLM_HEDGES, LLM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Ошибки, после которых повтор запроса имеет смысл
+_TRANSIENT_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+    TimeoutError,
+)
+# Причины APIConnectionError, которые возникают до отправки запроса
+# (например, пустой API-ключ в заголовке) и не исправятся повтором
+_LOCAL_ERRORS = (httpx.LocalProtocolError, httpx.UnsupportedProtocol)
+# Минимум замеров этапа, после которого p95 считается надёжным для хеджирования
+_HEDGE_MIN_SAMPLES = 20
+_LATENCY_WINDOW = 200
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Проверяет, что ошибка транзиентна: повтор может пройти, а сбой —
+    признак проблем реплики.
+
+    Args:
+        error: Ошибка попытки
+
+    Returns:
+        bool: False для нетранзиентных ошибок и локальных ошибок клиента
+    """
+    return isinstance(error, _TRANSIENT_ERRORS) and not isinstance(
+        error.__cause__, _LOCAL_ERRORS
+    )
+
+
+class LLMCallPolicy:
+    """Политика вызова LLM: таймауты этапов, повторы, хеджирование, размыкатели.
+
+    Реплику для каждой попытки выбирает LLMRouter. Попытка ограничена
+    таймаутом своего этапа. Транзиентные ошибки (соединение, таймаут, 429,
+    5xx) учитываются размыкателем реплики и повторяются с экспоненциальной
+    задержкой и случайным разбросом; остальные ошибки пробрасываются сразу.
+    Ошибки соединения, вызванные самим клиентом (некорректный заголовок
+    или схема URL), не повторяются и не размыкают цепь.
+    При включённом хеджировании, если ответ не пришёл за p95 задержки этапа,
+    дубликат запроса отправляется на другую реплику и берётся первый ответ.
+    Когда доступных реплик нет или повторы исчерпаны, вызов завершается
+    LLMUnavailableError.
+
+    Args:
+        router: Маршрутизатор по репликам бэкенда
+        timeout: Таймаут попытки по умолчанию в секундах
+        stage_timeouts: Таймауты попытки по этапам
+        max_retries: Повторов после первой попытки
+        backoff_base: Базовая задержка повтора в секундах
+        backoff_max: Максимальная задержка повтора в секундах
+        hedge: Включить хеджирование запросов
+        hedge_min_delay: Минимальная задержка дубликата в секундах
+
+    Example:
+        policy = LLMCallPolicy(router, 120, {"moderate_resume": 30}, 2, 0.5, 8,
+                               hedge=False, hedge_min_delay=1)
+        response = await policy.call(
+            "moderate_resume",
+            lambda client: client.chat.completions.create(...),
+        )
+    """
+
+    def __init__(
+        self,
+        router: LLMRouter,
+        timeout: float,
+        stage_timeouts: dict[str, float],
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        hedge: bool,
+        hedge_min_delay: float,
+    ) -> None:
+        self._router = router
+        self._timeout = timeout
+        self._stage_timeouts = stage_timeouts
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._hedge = hedge
+        self._hedge_min_delay = hedge_min_delay
+        self._latencies: dict[str, deque[float]] = {}
+
+    async def call(
+        self,
+        stage: str,
+        request: Callable[[AsyncOpenAI], Awaitable[T]],
+        cost: float = 1.0,
+        affinity: Optional[str] = None,
+    ) -> T:
+        """Выполняет запрос к LLM по политике этапа.
+
+        Args:
+            stage: Этап пайплайна (ключ таймаута и окна задержек)
+            request: Фабрика корутины запроса по клиенту реплики;
+                вызывается на каждую попытку
+            cost: Стоимость запроса для балансировки
+            affinity: Ключ близости для выбора реплики
+
+        Returns:
+            T: Ответ первой успешной попытки
+
+        Raises:
+            LLMUnavailableError: Если доступных реплик нет или повторы исчерпаны
+            Exception: Нетранзиентные ошибки запроса пробрасываются как есть
+        """
+        for attempt in range(self._max_retries + 1):
+            backend = self._router.acquire(cost, affinity)
+            try:
+                return await self._attempt(stage, request, backend, cost, affinity)
+            except _TRANSIENT_ERRORS as e:
+                if not _is_transient(e):
+                    raise
+                if attempt == self._max_retries:
+                    raise LLMUnavailableError(
+                        "LLM-сервис не ответил после повторных попыток"
+                    ) from e
+                delay = self._backoff(attempt)
+                logger.warning(
+                    "%s transient LLM error on %s, retry %d in %.2fs: %r",
+                    stage,
+                    backend.name,
+                    attempt + 1,
+                    delay,
+                    e,
+                )
+                LLM_RETRIES.labels(stage=stage).inc()
+                await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    async def _attempt(
+        self,
+        stage: str,
+        request: Callable[[AsyncOpenAI], Awaitable[T]],
+        backend: LLMBackend,
+        cost: float,
+        affinity: Optional[str],
+    ) -> T:
+        """Одна попытка на реплике и, при необходимости, дубликат на другой."""
+        delay = self._hedge_delay(stage)
+        timeout = self._stage_timeouts.get(stage, self._timeout)
+        tasks: dict[asyncio.Task, float] = {}
+        hedge: Optional[asyncio.Task] = None
+        try:
+            primary = self._spawn(request, backend, cost, timeout)
+            tasks[primary] = time.monotonic()
+            pending = {primary}
+            if delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    try:
+                        second = self._router.acquire(cost, affinity, exclude=backend)
+                    except LLMUnavailableError:
+                        second = None
+                    if second is not None:
+                        LLM_HEDGES.labels(stage=stage, result="sent").inc()
+                        hedge = self._spawn(request, second, cost, timeout)
+                        tasks[hedge] = time.monotonic()
+                        pending.add(hedge)
+                pending |= done
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is hedge:
+                        LLM_HEDGES.labels(stage=stage, result="won").inc()
+                    self._observe(stage, time.monotonic() - tasks[task])
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _spawn(
+        self,
+        request: Callable[[AsyncOpenAI], Awaitable[T]],
+        backend: LLMBackend,
+        cost: float,
+        timeout: float,
+    ) -> asyncio.Task:
+        """Запускает запрос на реплике; резерв нагрузки снимается по завершении."""
+        task = asyncio.ensure_future(self._send(request, backend, timeout))
+        task.add_done_callback(lambda _: self._router.release(backend, cost))
+        return task
+
+    async def _send(
+        self,
+        request: Callable[[AsyncOpenAI], Awaitable[T]],
+        backend: LLMBackend,
+        timeout: float,
+    ) -> T:
+        """Отправляет запрос на реплику, сообщая исход её размыкателю."""
+        breaker = backend.breaker
+        try:
+            with self._router.track(backend):
+                async with asyncio.timeout(timeout):
+                    result = await request(backend.client)
+        except Exception as e:
+            if _is_transient(e):
+                breaker.record_failure()
+            elif isinstance(e, _TRANSIENT_ERRORS):
+                # запрос не ушёл с клиента — о реплике ничего не известно
+                breaker.release()
+            else:
+                # запрос отвергнут по существу — реплика жива
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+    def _hedge_delay(self, stage: str) -> Optional[float]:
+        """Задержка дубликата: p95 этапа, но не меньше hedge_min_delay.
+
+        Returns:
+            Optional[float]: None, если хеджирование выключено или замеров мало
+        """
+        if not self._hedge:
+            return None
+        window = self._latencies.get(stage)
+        if window is None or len(window) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(window)
+        p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+        return max(p95, self._hedge_min_delay)
+
+    def _observe(self, stage: str, seconds: float) -> None:
+        self._latencies.setdefault(stage, deque(maxlen=_LATENCY_WINDOW)).append(seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        """Экспоненциальная задержка повтора с полным случайным разбросом."""
+        return random.uniform(
+            0, min(self._backoff_max, self._backoff_base * 2**attempt)
+        )
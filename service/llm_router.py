@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from openai import AsyncOpenAI
+
+from service.metrics import (
+    LLM_BACKEND_DURATION,
+    LLM_BACKEND_HEALTHY,
+    LLM_BACKEND_OUTSTANDING,
+    LLM_BACKEND_REQUESTS,
+    LLM_CIRCUIT_STATE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailableError(RuntimeError):
+    """LLM-бэкенд недоступен: цепь разомкнута или исчерпаны повторы."""
+
+
+class CircuitBreaker:
+    """Размыкатель цепи по подряд идущим сбоям бэкенда.
+
+    Closed — запросы проходят. После failure_threshold сбоев подряд цепь
+    размыкается (open) и запросы отклоняются сразу. Через reset_timeout
+    пропускается один пробный запрос (half-open): успех замыкает цепь,
+    сбой размыкает снова. Состояние отражается в moderator_llm_circuit_state.
+
+    Args:
+        name: Имя бэкенда (метка метрики)
+        failure_threshold: Сбоев подряд до размыкания (0 — размыкатель отключён)
+        reset_timeout: Время в секундах до пробного запроса
+
+    Example:
+        breaker = CircuitBreaker("llm-1", failure_threshold=5, reset_timeout=30)
+        if breaker.allow():
+            ...
+            breaker.record_success()
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float) -> None:
+        self._name = name
+        self._gauge = LLM_CIRCUIT_STATE.labels(backend=name)
+        self._threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+        self._gauge.set(self.CLOSED)
+
+    @property
+    def state(self) -> int:
+        """Текущее состояние: CLOSED, OPEN или HALF_OPEN."""
+        return self._state
+
+    def available(self) -> bool:
+        """Проверяет без побочных эффектов, пропустит ли allow() запрос."""
+        if self._state == self.OPEN:
+            return time.monotonic() - self._opened_at >= self._reset_timeout
+        return not (self._state == self.HALF_OPEN and self._probing)
+
+    def allow(self) -> bool:
+        """Решает, можно ли отправить запрос бэкенду.
+
+        Returns:
+            bool: False, если цепь разомкнута или пробный запрос уже идёт
+        """
+        if not self.available():
+            return False
+        if self._state == self.OPEN:
+            self._set_state(self.HALF_OPEN)
+        if self._state == self.HALF_OPEN:
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        """Учитывает успешный ответ бэкенда и замыкает цепь."""
+        self._failures = 0
+        self._probing = False
+        if self._state != self.CLOSED:
+            logger.info("LLM circuit closed: %s", self._name)
+            self._set_state(self.CLOSED)
+
+    def release(self) -> None:
+        """Снимает пробный запрос без вердикта (например, при отмене)."""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Учитывает сбой бэкенда; размыкает цепь по достижении порога."""
+        self._failures += 1
+        self._probing = False
+        if not self._threshold:
+            return
+        if self._state == self.HALF_OPEN or self._failures >= self._threshold:
+            if self._state != self.OPEN:
+                logger.warning(
+                    "LLM circuit opened: %s after %d failures",
+                    self._name,
+                    self._failures,
+                )
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: int) -> None:
+        self._state = state
+        self._gauge.set(state)
+
+
+class LLMBackend:
+    """Реплика LLM-бэкенда: клиент, размыкатель, нагрузка и здоровье.
+
+    Args:
+        name: Имя реплики (метка метрик)
+        client: Клиент OpenAI API реплики
+        weight: Относительная производительность реплики
+        breaker: Размыкатель цепи реплики
+    """
+
+    def __init__(
+        self, name: str, client: AsyncOpenAI, weight: float, breaker: CircuitBreaker
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.weight = weight
+        self.breaker = breaker
+        self.outstanding = 0.0
+        self.healthy = True
+        self.health_failures = 0
+        LLM_BACKEND_HEALTHY.labels(backend=name).set(1)
+
+    @property
+    def load(self) -> float:
+        """Суммарная стоимость выполняющихся запросов с учётом веса."""
+        return self.outstanding / self.weight
+
+    def available(self) -> bool:
+        """Реплика здорова и её цепь пропустит запрос."""
+        return self.healthy and self.breaker.available()
+
+
+class LLMRouter:
+    """Маршрутизатор запросов по пулу реплик LLM-бэкенда.
+
+    Запрос уходит на доступную реплику с наименьшей нагрузкой — суммой
+    стоимостей выполняющихся запросов, делённой на вес реплики. Стоимость
+    задаёт вызывающий: запрос VLM с изображениями дороже текстового.
+
+    При переданном ключе близости (хэше статического префикса промпта)
+    реплика выбирается rendezvous-хэшированием среди тех, чья нагрузка
+    превышает минимальную не больше чем на стоимость запроса: одинаковые
+    префиксы попадают на одну реплику и её префиксный кэш, пока это не
+    перегружает её относительно остальных.
+
+    Активная проверка здоровья раз в health_interval секунд запрашивает
+    список моделей каждой реплики; не ответившие health_failures раз подряд
+    исключаются из выбора. Если здоровых реплик не осталось, выбор идёт
+    среди нездоровых: за отказ отвечают размыкатели, а не проверка.
+    С одной репликой проверка не запускается — исключать её не в пользу
+    кого.
+
+    Args:
+        backends: Реплики бэкенда
+        sticky: Учитывать ключ близости при выборе реплики
+        health_interval: Период проверки здоровья в секундах (0 — отключена)
+        health_timeout: Таймаут проверки здоровья в секундах
+        health_failures: Неудачных проверок подряд до исключения реплики
+
+    Example:
+        router = LLMRouter(
+            backends, sticky=True, health_interval=15, health_timeout=5,
+            health_failures=3,
+        )
+        router.start()
+        backend = router.acquire(cost=4.0, affinity=prefix_hash)
+        try:
+            with router.track(backend):
+                response = await backend.client.chat.completions.create(...)
+        finally:
+            router.release(backend, cost=4.0)
+        await router.close()
+    """
+
+    def __init__(
+        self,
+        backends: list[LLMBackend],
+        sticky: bool,
+        health_interval: float,
+        health_timeout: float,
+        health_failures: int = 3,
+    ) -> None:
+        self.backends = backends
+        self._sticky = sticky
+        self._health_interval = health_interval
+        self._health_timeout = health_timeout
+        self._health_failures = max(1, health_failures)
+        self._health_task: Optional[asyncio.Task] = None
+
+    def acquire(
+        self,
+        cost: float,
+        affinity: Optional[str] = None,
+        exclude: Optional[LLMBackend] = None,
+    ) -> LLMBackend:
+        """Выбирает реплику для запроса и резервирует её размыкатель и нагрузку.
+
+        Резерв нагрузки снимается release() после завершения запроса.
+
+        Args:
+            cost: Стоимость запроса
+            affinity: Ключ близости (хэш статического префикса промпта)
+            exclude: Реплика, которую по возможности не выбирать (для дубликата)
+
+        Returns:
+            LLMBackend: Выбранная реплика
+
+        Raises:
+            LLMUnavailableError: Если доступных реплик нет
+        """
+        candidates = [b for b in self.backends if b.available()]
+        if not candidates:
+            # все реплики не прошли проверку здоровья — решают размыкатели
+            candidates = [b for b in self.backends if b.breaker.available()]
+        if exclude is not None and len(candidates) > 1:
+            candidates = [b for b in candidates if b is not exclude]
+        if not candidates:
+            raise LLMUnavailableError("LLM-сервис временно недоступен")
+        lightest = min(b.load for b in candidates)
+        if self._sticky and affinity is not None:
+            candidates = [b for b in candidates if b.load <= lightest + cost / b.weight]
+            backend = max(candidates, key=lambda b: self._rendezvous(affinity, b))
+        else:
+            backend = min(candidates, key=lambda b: b.load)
+        backend.breaker.allow()
+        backend.outstanding += cost
+        LLM_BACKEND_OUTSTANDING.labels(backend=backend.name).set(backend.outstanding)
+        return backend
+
+    def release(self, backend: LLMBackend, cost: float) -> None:
+        """Снимает резерв нагрузки, сделанный acquire().
+
+        Args:
+            backend: Реплика
+            cost: Стоимость запроса
+        """
+        backend.outstanding -= cost
+        LLM_BACKEND_OUTSTANDING.labels(backend=backend.name).set(backend.outstanding)
+
+    @contextmanager
+    def track(self, backend: LLMBackend) -> Iterator[None]:
+        """Учитывает длительность и исход запроса в метриках реплики.
+
+        Args:
+            backend: Реплика
+        """
+        start = time.perf_counter()
+        result = "cancelled"
+        try:
+            yield
+            result = "ok"
+        except Exception:
+            result = "error"
+            raise
+        finally:
+            LLM_BACKEND_REQUESTS.labels(backend=backend.name, result=result).inc()
+            LLM_BACKEND_DURATION.labels(backend=backend.name).observe(
+                time.perf_counter() - start
+            )
+
+    def start(self) -> None:
+        """Запускает фоновую проверку здоровья реплик (в работающем цикле).
+
+        С одной репликой проверка не запускается.
+        """
+        if (
+            self._health_interval
+            and len(self.backends) > 1
+            and self._health_task is None
+        ):
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """Останавливает проверку здоровья и закрывает клиенты реплик."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for backend in self.backends:
+            await backend.client.close()
+
+    async def check_health(self) -> None:
+        """Однократно проверяет все реплики запросом списка моделей."""
+        await asyncio.gather(*(self._check(b) for b in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self._health_interval)
+
+    async def _check(self, backend: LLMBackend) -> None:
+        try:
+            await backend.client.models.list(timeout=self._health_timeout)
+            backend.health_failures = 0
+        except Exception as e:
+            backend.health_failures += 1
+            logger.debug(
+                "LLM health check failed: %s (%d in a row): %r",
+                backend.name,
+                backend.health_failures,
+                e,
+            )
+        healthy = backend.health_failures < self._health_failures
+        if not healthy and backend.healthy:
+            logger.warning(
+                "LLM backend unhealthy: %s after %d failed checks",
+                backend.name,
+                backend.health_failures,
+            )
+        if healthy and not backend.healthy:
+            logger.info("LLM backend healthy again: %s", backend.name)
+        backend.healthy = healthy
+        LLM_BACKEND_HEALTHY.labels(backend=backend.name).set(int(healthy))
+
+    @staticmethod
+    def _rendezvous(affinity: str, backend: LLMBackend) -> float:
+        """Вес реплики для ключа близости (weighted rendezvous hashing)."""
+        digest = hashlib.blake2b(
+            f"{affinity}|{backend.name}".encode(), digest_size=8
+        ).digest()
+        # u равномерно на (0, 1): -weight / ln(u) — больший вес чаще побеждает
+        u = (int.from_bytes(digest, "big") + 1) / (2**64 + 2)
+        return -backend.weight / math.log(u)
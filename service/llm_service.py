@@ -1,18 +1,21 @@
-import base64
+import asyncio
+import hashlib
+import json
 import logging
 import re
+import time
 from datetime import date, timedelta
-from io import BytesIO
-from typing import Optional
+from typing import Optional, TypeVar
 
-from openai import AsyncOpenAI
-from pdf2image import convert_from_path
-from pydantic import BaseModel
+import httpx
+from openai import AsyncOpenAI, BadRequestError, DefaultAsyncHttpxClient
+from pydantic import BaseModel, ValidationError
 
 from configs.required_specialties import required_specialties
-from configs.settings import Settings
+from configs.settings import LLMBackendSettings, Settings
 from configs.specialties import uni_spec
 from routers.schemas import (
+    DEFAULT_RULES,
     Degree,
     EducationDocType,
     EducationInfo,
@@ -22,18 +25,178 @@ from routers.schemas import (
     ResponseWithReasoning,
     Rule,
 )
+from service.metrics import (
+    LLM_CONNECTIONS,
+    LLM_PARSE,
+    LLM_POOL_WAIT,
+    LLM_REPAIR_SAVED_TOKENS,
+    LLM_REPAIRS,
+    LLM_TOKENS,
+    VERIFICATIONS,
+    track_stage,
+)
+from service.llm_policy import LLMCallPolicy
+from service.llm_router import CircuitBreaker, LLMBackend, LLMRouter
+from service.render_service import RenderService
+from service.result_cache import ResultCache
+from service.specialty_index import SpecialtyIndex
 
 logger = logging.getLogger(__name__)
 
-_MAX_PAGES = 3
+# Версии промптов: менять при любом изменении соответствующего промпта
+# или обработки ответа, иначе кэш будет отдавать устаревшие результаты.
+_MODERATION_PROMPT_VERSION = "2"
+_EDUCATION_PROMPT_VERSION = "5"
+# Поля анкеты, которые попадают в промпт check_education (часть ключа кэша)
+_EDUCATION_PROMPT_FIELDS = {
+    "specialty",
+    "level",
+    "institutionName",
+    "dateOfAdmission",
+    "dateOfGraduation",
+    "haveDiploma",
+}
+# Настройки, от которых зависит ответ check_education (часть ключа кэша):
+# изображения документа, шорт-лист специальностей и эскалация
+_EDUCATION_CACHE_SETTINGS = {
+    "render_dpi",
+    "render_max_long_edge",
+    "render_max_megapixels",
+    "render_jpeg_quality",
+    "render_grayscale",
+    "render_max_request_bytes",
+    "page_selection_window",
+    "verification_escalation",
+    "verification_first_dpi",
+    "verification_first_pages",
+    "specialty_top_k",
+    "specialty_min_score",
+}
+
+# Системные промпты неизменны между запросами и идут первыми, данные запроса —
+# последними: так бэкенды с префиксным кэшем (vLLM, SGLang) переиспользуют
+# уже посчитанный префикс. Любая правка здесь инвалидирует этот кэш.
+_MODERATION_SYSTEM_PROMPT = (
+    "Ты модератор резюме для государственного кадрового резерва. "
+    "Проверь резюме на соответствие каждому правилу. "
+    "Для каждого нарушенного правила укажи его id, условие и конкретный "
+    "фрагмент резюме, который нарушает правило. "
+    "Если нарушений нет — violatedRules должен быть пустым списком. "
+    "Верни строго валидный JSON без markdown: "
+    '{"reasoning": "...", "violatedRules": [{"id": "...", "condition": "...", "resume_fragment": "..."}]}'
+    " /no_think"
+)
+_EDUCATION_SYSTEM_PROMPT = (
+    "Ты эксперт по верификации документов об образовании. "
+    "Ты получаешь данные из анкеты и изображения документа. "
+    "Если данные из анкеты противоречат документу — доверяй документу. "
+    "Определи: является ли это высшим образованием (не СПО, не ДПО, не курсы — "
+    "только бакалавриат, магистратура, специалитет). "
+    "Тип документа: Diploma если диплом о завершённом высшем образовании, "
+    "Certificate если справка о прохождении (образование ещё не завершено), "
+    "null если не высшее. "
+    "Степень (degree): Bachelor, Master, Specialist или null если не высшее. "
+    "Найди стандартизованное название и код специальности из предоставленного списка. "
+    "Код должен быть из списка — если в документе другой код, найди по названию. "
+    "Если это Certificate — укажи предполагаемый год окончания в expectedGraduationYear. "
+    "Извлеки ФИО владельца документа точно как написано в документе в поле fullName "
+    "(null если ФИО не найдено). "
+    "Сравни ФИО из документа с ФИО из анкеты по следующим правилам: "
+    "1) учитывай разный регистр и родительный падеж; "
+    "2) если в анкете нет отчества — сравнивай только по фамилии и имени, отсутствие отчества не является несовпадением тоесть если в анкете или дипломе нет отчества то не проверяй отчкство а смотри имя и фамилию "
+    "3) если владелец документа — женщина (определяй по имени и отчеству)тк фамилия может отличаться (девичья фамилия) "
+    "то сравнивай по имени и отчеству (фамилия могла измениться после замужества); "
+    "если совпадают — fullNameMatches = true, иначе false; если ФИО не найдено в документе — null. "
+    "Проанализируй документ на изображениях и верни структурированный ответ. "
+    "Верни строго валидный JSON без markdown: "
+    '{"isHigherEducation": true/false, '
+    '"fullName": "Фамилия Имя Отчество" or null, '
+    '"fullNameMatches": true/false/null, '
+    '"code": "01.03.02" or null, '
+    '"name": "Название" or null, '
+    '"degree": "Bachelor"/"Master"/"Specialist" or null, '
+    '"docType": "Diploma"/"Certificate" or null, '
+    '"expectedGraduationYear": 2026 or null}'
+    " /no_think"
+)
+
+_Model = TypeVar("_Model", bound=BaseModel)
+# Сколько последних символов невалидного ответа отправлять на исправление
+_REPAIR_MAX_CHARS = 8000
+# Общий лимит времени фонового прогрева в секундах
+_WARMUP_TIMEOUT = 15
+
 _BASE64_RE = re.compile(r"(data:image/[^;]+;base64,)[A-Za-z0-9+/=]{40,}")
+# Признаки того, что бэкенд отверг именно response_format, а не запрос целиком
+_RESPONSE_FORMAT_ERROR_RE = re.compile(
+    r"response_format|json_schema|guided", re.IGNORECASE
+)
 
 
 def _truncate_base64(text: str) -> str:
     return _BASE64_RE.sub(r"\1<base64 truncated>", text)
 
 
-_SPECIALTIES_TEXT = "\n".join(f"{code}: {name}" for code, name in uni_spec.items())
+def _http_timeout(settings: Settings) -> httpx.Timeout:
+    """Таймауты HTTP-клиента LLM; нулевые значения заменяются на llm_timeout."""
+    return httpx.Timeout(
+        settings.llm_timeout,
+        connect=settings.llm_connect_timeout or settings.llm_timeout,
+        read=settings.llm_read_timeout or settings.llm_timeout,
+        write=settings.llm_write_timeout or settings.llm_timeout,
+        pool=settings.llm_pool_timeout or settings.llm_timeout,
+    )
+
+
+def _http_client(settings: Settings, backend: str) -> httpx.AsyncClient:
+    """Создаёт пул HTTP-соединений к реплике LLM по настройкам.
+
+    Каждый запрос трассируется через расширение httpcore "trace": время
+    от отправки запроса в пул до открытия нового соединения или до начала
+    отправки по уже открытому попадает в moderator_llm_pool_wait_seconds,
+    тип соединения — в moderator_llm_connections_total.
+
+    Args:
+        settings: Настройки приложения (лимиты пула, keep-alive, HTTP/2, таймауты)
+        backend: Имя реплики (метка метрик)
+
+    Returns:
+        httpx.AsyncClient: Клиент для AsyncOpenAI(http_client=...)
+    """
+    pool_wait = LLM_POOL_WAIT.labels(backend=backend)
+
+    async def trace_pool_wait(request: httpx.Request) -> None:
+        start = time.perf_counter()
+        previous = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict) -> None:
+            nonlocal start
+            if previous is not None:
+                await previous(event, info)
+            if start is None:
+                return
+            if event == "connection.connect_tcp.started":
+                kind = "new"
+            elif event.endswith(".send_request_headers.started"):
+                kind = "reused"
+            else:
+                return
+            pool_wait.observe(time.perf_counter() - start)
+            LLM_CONNECTIONS.labels(backend=backend, kind=kind).inc()
+            start = None
+
+        request.extensions["trace"] = trace
+
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        ),
+        timeout=_http_timeout(settings),
+        http2=settings.llm_http2,
+        event_hooks={"request": [trace_pool_wait]},
+    )
 
 
 class _EducationLLMResult(BaseModel):
@@ -60,22 +223,101 @@ class LLMService:
     - moderate_resume: проверка текста резюме на соответствие правилам
     - check_education: верификация документа об образовании через VLM
 
+    Результаты moderate_resume кэшируются по тексту резюме и набору правил,
+    результаты check_education — по хэшу документа, данным анкеты и
+    настройкам рендеринга, шорт-листа и эскалации; в ключ обоих кэшей
+    входят модель, режим structured output и версия промпта.
+
+    В промпт check_education попадают только специальности-кандидаты,
+    подобранные локальным индексом по специальности из анкеты; при низкой
+    уверенности индекса передаётся полный классификатор. Код и название
+    из ответа VLM приводятся к записи классификатора локально.
+
+    Вызовы LLM идут через LLMCallPolicy по пулу реплик (LLMRouter):
+    балансировка по стоимости выполняющихся запросов, где изображение
+    стоит llm_image_cost текстовых запросов, с привязкой одинаковых
+    префиксов промпта к одной реплике. Когда доступных реплик нет, этап
+    завершается LLMUnavailableError без ожидания полного таймаута.
+
     Args:
-        settings: Настройки приложения (base_url, api_key, model, timeout)
+        settings: Настройки приложения (реплики LLM, model, политика вызовов)
+        render_service: Сервис рендеринга страниц PDF
 
     Example:
-        service = LLMService(settings)
+        service = LLMService(settings, render_service)
         result = await service.moderate_resume(resume_text, rules)
         edu_info = await service.check_education(edu, "/app/storage/Diploma.pdf")
     """
 
-    def __init__(self, settings: Settings) -> None:
-        self._client = AsyncOpenAI(
-            base_url=settings.llm_base_url,
-            api_key=settings.llm_api_key,
+    def __init__(self, settings: Settings, render_service: RenderService) -> None:
+        self._render_service = render_service
+        backends = settings.llm_backends or [
+            LLMBackendSettings(base_url=settings.llm_base_url)
+        ]
+        self._router = LLMRouter(
+            [
+                LLMBackend(
+                    name=backend.base_url,
+                    client=AsyncOpenAI(
+                        base_url=backend.base_url,
+                        api_key=backend.api_key or settings.llm_api_key,
+                        timeout=_http_timeout(settings),
+                        # повторы выполняет LLMCallPolicy
+                        max_retries=0,
+                        http_client=_http_client(settings, backend.base_url),
+                    ),
+                    weight=backend.weight,
+                    breaker=CircuitBreaker(
+                        backend.base_url,
+                        settings.llm_breaker_threshold,
+                        settings.llm_breaker_reset_timeout,
+                    ),
+                )
+                for backend in backends
+            ],
+            sticky=settings.llm_sticky_routing,
+            health_interval=settings.llm_health_interval,
+            health_timeout=settings.llm_health_timeout,
+            health_failures=settings.llm_health_failures,
+        )
+        self._image_cost = settings.llm_image_cost
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._policy = LLMCallPolicy(
+            self._router,
             timeout=settings.llm_timeout,
+            stage_timeouts=settings.llm_stage_timeouts,
+            max_retries=settings.llm_max_retries,
+            backoff_base=settings.llm_retry_backoff,
+            backoff_max=settings.llm_retry_backoff_max,
+            hedge=settings.llm_hedge,
+            hedge_min_delay=settings.llm_hedge_min_delay,
         )
         self._model = settings.llm_model
+        self._structured_output = settings.llm_structured_output
+        self._repair_attempts = settings.llm_repair_attempts
+        self._specialty_index = SpecialtyIndex(uni_spec, required_specialties)
+        self._specialty_top_k = settings.specialty_top_k
+        self._specialty_min_score = settings.specialty_min_score
+        self._escalation = settings.verification_escalation
+        self._first_stage_dpi = settings.verification_first_dpi
+        self._first_stage_pages = settings.verification_first_pages
+        self._education_settings = settings.model_dump(
+            mode="json", include=_EDUCATION_CACHE_SETTINGS
+        )
+        self._moderation_cache = ResultCache(
+            "moderation",
+            ResponseWithReasoning,
+            max_entries=settings.result_cache_max_entries,
+            ttl=settings.result_cache_ttl,
+            db_path=settings.result_cache_path,
+        )
+        self._education_cache = ResultCache(
+            "education",
+            EducationInfo,
+            max_entries=settings.result_cache_max_entries,
+            ttl=settings.result_cache_ttl,
+            db_path=settings.result_cache_path,
+        )
 
     async def moderate_resume(
         self, resume_text: str, rules: list[Rule]
@@ -89,36 +331,41 @@ class LLMService:
         Returns:
             ResponseWithReasoning: Рассуждение и список нарушенных правил
         """
+        cache_key = ResultCache.make_key(
+            resume_text,
+            self._canonical_rules(rules),
+            self._model,
+            self._structured_output,
+            _MODERATION_PROMPT_VERSION,
+        )
+        cached = await self._moderation_cache.get(cache_key)
+        if cached is not None:
+            logger.info("moderate_resume cache hit")
+            return cached
+
         rules_text = "\n".join(f"{r.id}. {r.condition}" for r in rules)
 
-        response = await self._client.chat.completions.create(
-            model=self._model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Ты модератор резюме для государственного кадрового резерва. "
-                        "Проверь резюме на соответствие каждому правилу. "
-                        "Для каждого нарушенного правила укажи его id, условие и конкретный "
-                        "фрагмент резюме, который нарушает правило. "
-                        "Если нарушений нет — violatedRules должен быть пустым списком. "
-                        "Верни строго валидный JSON без markdown: "
-                        '{"reasoning": "...", "violatedRules": [{"id": "...", "condition": "...", "resume_fragment": "..."}]}'
-                        " /no_think"
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": f"ПРАВИЛА МОДЕРАЦИИ:\n{rules_text}\n\nРЕЗЮМЕ:\n{resume_text}",
-                },
-            ],
-        )
+        with track_stage("moderate_resume"):
+            response = await self._complete(
+                "moderate_resume",
+                self._moderation_messages(rules_text, resume_text),
+                ResponseWithReasoning,
+            )
+        self._record_usage("moderate_resume", response)
         content = response.choices[0].message.content
         logger.debug("moderate_resume raw response: %s", content)
-        return ResponseWithReasoning.model_validate_json(self._extract_json(content))
+        result = await self._parse_or_repair(
+            "moderate_resume", ResponseWithReasoning, response
+        )
+        await self._moderation_cache.set(cache_key, result)
+        return result
 
     async def check_education(
-        self, edu: HigherEducation, file_path: str, resume_fullname: str
+        self,
+        edu: HigherEducation,
+        file_path: str,
+        resume_fullname: str,
+        document_id: Optional[str] = None,
     ) -> EducationInfo:
         """Верифицирует документ об образовании через VLM.
 
@@ -129,6 +376,8 @@ class LLMService:
             edu: Запись о высшем образовании из анкеты
             file_path: Путь к PDF-файлу документа об образовании
             resume_fullname: ФИО владельца из анкеты для сверки с документом
+            document_id: Идентификатор документа (хэш содержимого) для кэша;
+                None — без кэширования
 
         Returns:
             EducationInfo: Верифицированные данные об образовании с вердиктом
@@ -141,8 +390,21 @@ class LLMService:
             resume_fullname,
             file_path,
         )
-        pages = convert_from_path(file_path, dpi=150, last_page=_MAX_PAGES)
-        image_contents = [self._page_to_content(page) for page in pages]
+        cache_key = None
+        if document_id is not None:
+            cache_key = ResultCache.make_key(
+                document_id,
+                edu.model_dump(mode="json", include=_EDUCATION_PROMPT_FIELDS),
+                resume_fullname,
+                self._model,
+                self._education_settings,
+                self._structured_output,
+                _EDUCATION_PROMPT_VERSION,
+            )
+            cached = await self._education_cache.get(cache_key)
+            if cached is not None:
+                logger.info("check_education cache hit: document=%r", document_id)
+                return cached
 
         edu_text = (
             f"ФИО из анкеты: {resume_fullname}\n"
@@ -152,73 +414,71 @@ class LLMService:
             f"Период: {edu.dateOfAdmission} — {edu.dateOfGraduation}\n"
             f"Наличие диплома: {'Да' if edu.haveDiploma else 'Нет'}"
         )
-
-        response = await self._client.chat.completions.create(
-            model=self._model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Ты эксперт по верификации документов об образовании. "
-                        "Ты получаешь данные из анкеты и изображения документа. "
-                        "Если данные из анкеты противоречат документу — доверяй документу. "
-                        "Определи: является ли это высшим образованием (не СПО, не ДПО, не курсы — "
-                        "только бакалавриат, магистратура, специалитет). "
-                        "Тип документа: Diploma если диплом о завершённом высшем образовании, "
-                        "Certificate если справка о прохождении (образование ещё не завершено), "
-                        "null если не высшее. "
-                        "Степень (degree): Bachelor, Master, Specialist или null если не высшее. "
-                        "Найди стандартизованное название и код специальности из предоставленного списка. "
-                        "Код должен быть из списка — если в документе другой код, найди по названию. "
-                        "Если это Certificate — укажи предполагаемый год окончания в expectedGraduationYear. "
-                        "Извлеки ФИО владельца документа точно как написано в документе в поле fullName "
-                        "(null если ФИО не найдено). "
-                        "Сравни ФИО из документа с ФИО из анкеты по следующим правилам: "
-                        "1) учитывай разный регистр и родительный падеж; "
-                        "2) если в анкете нет отчества — сравнивай только по фамилии и имени, отсутствие отчества не является несовпадением тоесть если в анкете или дипломе нет отчества то не проверяй отчкство а смотри имя и фамилию "
-                        "3) если владелец документа — женщина (определяй по имени и отчеству)тк фамилия может отличаться (девичья фамилия) "
-                        "то сравнивай по имени и отчеству (фамилия могла измениться после замужества); "
-                        "если совпадают — fullNameMatches = true, иначе false; если ФИО не найдено в документе — null. "
-                        "Верни строго валидный JSON без markdown: "
-                        '{"isHigherEducation": true/false, '
-                        '"fullName": "Фамилия Имя Отчество" or null, '
-                        '"fullNameMatches": true/false/null, '
-                        '"code": "01.03.02" or null, '
-                        '"name": "Название" or null, '
-                        '"degree": "Bachelor"/"Master"/"Specialist" or null, '
-                        '"docType": "Diploma"/"Certificate" or null, '
-                        '"expectedGraduationYear": 2026 or null}'
-                        " /no_think"
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                f"ДАННЫЕ ИЗ АНКЕТЫ:\n{edu_text}\n\n"
-                                f"СПИСОК СПЕЦИАЛЬНОСТЕЙ (код: название):\n{_SPECIALTIES_TEXT}\n\n"
-                                "Проанализируй документ на изображениях и верни структурированный ответ."
-                            ),
-                        },
-                        *image_contents,
-                    ],
-                },
-            ],
+        candidates = self._specialty_index.shortlist(
+            edu.specialty, self._specialty_top_k, self._specialty_min_score
         )
-
-        content = response.choices[0].message.content
-        logger.info("check_education raw response: %s", _truncate_base64(content or ""))
-        result = _EducationLLMResult.model_validate_json(self._extract_json(content))
-        logger.info(
-            "check_education parsed: fullName=%r fullNameMatches=%r",
-            result.fullName,
-            result.fullNameMatches,
+        if candidates is None:
+            specialties_text = (
+                "СПИСОК СПЕЦИАЛЬНОСТЕЙ (код: название):\n"
+                f"{self._specialty_index.full_text}"
+            )
+        else:
+            specialties_text = (
+                "СПЕЦИАЛЬНОСТИ-КАНДИДАТЫ ПО ДАННЫМ АНКЕТЫ (код: название):\n"
+                f"{self._specialty_index.render(candidates)}\n"
+                "Если специальности из документа нет среди кандидатов — "
+                "укажи код и название точно как в документе."
+            )
+        logger.debug(
+            "check_education specialties: %s",
+            "full list" if candidates is None else f"{len(candidates)} candidates",
         )
+
+        result = None
+        if self._escalation:
+            try:
+                with track_stage("verification_first"):
+                    result = await self._verify_document(
+                        file_path,
+                        edu_text,
+                        specialties_text,
+                        dpi=self._first_stage_dpi,
+                        max_pages=self._first_stage_pages,
+                    )
+                reason = self._escalation_reason(result)
+            except ValueError:
+                # Невалидный ответ первой стадии — перепроверяем полным запросом
+                logger.warning("check_education first stage unparsable", exc_info=True)
+                reason = "invalidResponse"
+            if reason is None:
+                VERIFICATIONS.labels(outcome="first_stage").inc()
+            else:
+                logger.info(
+                    "check_education escalated: reason=%s document=%r",
+                    reason,
+                    document_id,
+                )
+                VERIFICATIONS.labels(outcome="escalated").inc()
+                result = None
+        if result is None:
+            with track_stage("verification_full"):
+                result = await self._verify_document(
+                    file_path, edu_text, specialties_text
+                )
+
+        code, name = self._specialty_index.canonicalize(result.code, result.name)
+        if (code, name) != (result.code, result.name):
+            logger.info(
+                "check_education specialty canonicalized: %r %r -> %r %r",
+                result.code,
+                result.name,
+                code,
+                name,
+            )
+            result = result.model_copy(update={"code": code, "name": name})
         resolution = self._compute_resolution(result)
 
-        return EducationInfo(
+        info = EducationInfo(
             isHigherEducation=result.isHigherEducation,
             fullName=result.fullName,
             code=result.code,
@@ -228,6 +488,156 @@ class LLMService:
             expectedGraduationYear=result.expectedGraduationYear,
             resolution=resolution,
         )
+        if cache_key is not None:
+            await self._education_cache.set(cache_key, info)
+        return info
+
+    def start_health_checks(self) -> None:
+        """Запускает фоновую проверку здоровья реплик LLM (в работающем цикле)."""
+        self._router.start()
+
+    def start_warm_up(self) -> None:
+        """Запускает прогрев префиксного кэша фоновой задачей (в работающем цикле).
+
+        Старт сервиса не ждёт прогрева; задача отменяется в aclose().
+        """
+        if self._warmup_task is None:
+            self._warmup_task = asyncio.create_task(self.warm_up())
+
+    async def aclose(self) -> None:
+        """Останавливает прогрев и проверку здоровья, закрывает клиенты реплик LLM."""
+        if self._warmup_task is not None:
+            self._warmup_task.cancel()
+            await asyncio.gather(self._warmup_task, return_exceptions=True)
+            self._warmup_task = None
+        await self._router.close()
+
+    async def warm_up(self) -> None:
+        """Прогревает префиксный кэш системными промптами этапов.
+
+        Общий префикс рабочих запросов — только системное сообщение
+        (для модерации — с правилами по умолчанию): шорт-лист специальностей
+        и данные анкеты зависят от запроса. Запросы на один токен ответа
+        идут через LLMCallPolicy с тем же ключом близости, что и рабочие,
+        поэтому попадают на ту же реплику и учитываются её размыкателем.
+        Прогрев ограничен _WARMUP_TIMEOUT секундам; ошибки только
+        логируются — сервис работоспособен и без прогрева.
+        """
+        rules_text = "\n".join(f"{r.id}. {r.condition}" for r in DEFAULT_RULES)
+        prompts = {
+            "moderate_resume": self._moderation_messages(rules_text, "")[0],
+            "check_education": self._education_messages("", "", [])[0],
+        }
+        stages = list(prompts)
+        try:
+            async with asyncio.timeout(_WARMUP_TIMEOUT):
+                results = await asyncio.gather(
+                    *(self._warm_up_stage(stage, prompts[stage]) for stage in stages),
+                    return_exceptions=True,
+                )
+        except TimeoutError:
+            logger.warning("LLM warm-up timed out after %ss", _WARMUP_TIMEOUT)
+            return
+        for stage, result in zip(stages, results):
+            if isinstance(result, Exception):
+                logger.warning("LLM warm-up failed: stage=%s", stage, exc_info=result)
+        logger.info("LLM warm-up finished")
+
+    async def _warm_up_stage(self, stage: str, system_message: dict) -> None:
+        """Отправляет системный промпт этапа с пустым пользовательским сообщением."""
+        messages = [system_message, {"role": "user", "content": ""}]
+        response = await self._policy.call(
+            f"{stage}_warmup",
+            lambda client: client.chat.completions.create(
+                model=self._model, messages=messages, max_tokens=1
+            ),
+            affinity=self._affinity(messages),
+        )
+        self._record_usage(f"{stage}_warmup", response)
+
+    async def _verify_document(
+        self,
+        file_path: str,
+        edu_text: str,
+        specialties_text: str,
+        dpi: Optional[int] = None,
+        max_pages: Optional[int] = None,
+    ) -> _EducationLLMResult:
+        """Отправляет страницы документа в VLM и разбирает ответ.
+
+        Args:
+            file_path: Путь к PDF-файлу документа об образовании
+            edu_text: Данные из анкеты для промпта
+            specialties_text: Блок специальностей для промпта
+            dpi: Разрешение страниц (по умолчанию render_dpi)
+            max_pages: Число страниц (по умолчанию — все выбранные)
+
+        Returns:
+            _EducationLLMResult: Структурированный ответ VLM
+        """
+        with track_stage("render"):
+            pages = await self._render_service.render(
+                file_path, dpi=dpi, max_pages=max_pages
+            )
+        image_contents = [self._page_to_content(page) for page in pages]
+
+        with track_stage("check_education"):
+            response = await self._complete(
+                "check_education",
+                self._education_messages(specialties_text, edu_text, image_contents),
+                _EducationLLMResult,
+            )
+
+        self._record_usage("check_education", response)
+        content = response.choices[0].message.content
+        logger.info("check_education raw response: %s", _truncate_base64(content or ""))
+        result = await self._parse_or_repair(
+            "check_education", _EducationLLMResult, response
+        )
+        logger.info(
+            "check_education parsed: fullName=%r fullNameMatches=%r",
+            result.fullName,
+            result.fullNameMatches,
+        )
+        return result
+
+    @staticmethod
+    def _escalation_reason(result: _EducationLLMResult) -> Optional[str]:
+        """Проверяет, достаточно ли ответа первой стадии проверки документа.
+
+        Ответ по одной странице в низком разрешении принимается, только если
+        в нём есть ключевые поля и они согласованы между собой. Несовпадение
+        ФИО тоже перепроверяется: отрицательный вердикт по нечёткому
+        изображению слишком дорог для кандидата.
+
+        Args:
+            result: Ответ VLM первой стадии
+
+        Returns:
+            Optional[str]: Причина эскалации или None, если ответ принят
+        """
+        if result.fullName is None:
+            return "fullName"
+        if result.fullNameMatches is None:
+            return "fullNameMatches"
+        if result.fullNameMatches is False:
+            return "fullNameMismatch"
+        if not result.isHigherEducation:
+            if result.docType is not None or result.degree is not None:
+                return "inconsistentNotHigher"
+            return None
+        if result.code is None and result.name is None:
+            return "specialty"
+        if result.docType is None:
+            return "docType"
+        if result.degree is None:
+            return "degree"
+        if (
+            result.docType == EducationDocType.Certificate
+            and result.expectedGraduationYear is None
+        ):
+            return "expectedGraduationYear"
+        return None
 
     def _compute_resolution(self, result: _EducationLLMResult) -> EducationResolution:
         """Вычисляет вердикт по результату LLM на основе бизнес-правил.
@@ -258,7 +668,7 @@ class LLMService:
                 valid=False, noValidReason=NoValidReason.SpecialtyNotFound
             )
 
-        if result.name not in required_specialties:
+        if not self._specialty_index.is_required(result.name):
             return EducationResolution(
                 valid=False, noValidReason=NoValidReason.SpecialtyNotInList
             )
@@ -275,6 +685,315 @@ class LLMService:
 
         return EducationResolution(valid=True)
 
+    async def _complete(
+        self, stage: str, messages: list[dict], output_model: type[BaseModel]
+    ):
+        """Вызывает chat.completions, при включённом режиме — со схемой ответа.
+
+        Запрос выполняется через LLMCallPolicy этапа: таймаут, повторы,
+        хеджирование и размыкатели реплик. Стоимость запроса для балансировки —
+        1 плюс llm_image_cost за каждое изображение, ключ близости — хэш
+        системного промпта. В режиме structured output бэкенду
+        передаётся response_format с JSON-схемой output_model для guided
+        decoding. Если бэкенд отвергает именно response_format (по param
+        или тексту ошибки), режим отключается до перезапуска и запрос
+        повторяется без схемы; остальные ошибки 400 пробрасываются.
+
+        Args:
+            stage: Этап пайплайна (ключ таймаута политики)
+            messages: Сообщения запроса
+            output_model: Модель ожидаемого ответа
+
+        Returns:
+            ChatCompletion: Ответ LLM
+
+        Raises:
+            LLMUnavailableError: Если бэкенд недоступен
+        """
+        images = sum(
+            part.get("type") == "image_url"
+            for message in messages
+            if isinstance(message["content"], list)
+            for part in message["content"]
+        )
+        cost = 1 + images * self._image_cost
+        affinity = self._affinity(messages)
+        if self._structured_output:
+            response_format = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": output_model.__name__.lstrip("_"),
+                    "schema": output_model.model_json_schema(),
+                },
+            }
+            try:
+                return await self._policy.call(
+                    stage,
+                    lambda client: client.chat.completions.create(
+                        model=self._model,
+                        messages=messages,
+                        response_format=response_format,
+                    ),
+                    cost,
+                    affinity,
+                )
+            except BadRequestError as e:
+                if not self._rejects_response_format(e):
+                    raise
+                logger.warning(
+                    "response_format rejected by backend, structured output disabled",
+                    exc_info=True,
+                )
+                self._structured_output = False
+        return await self._policy.call(
+            stage,
+            lambda client: client.chat.completions.create(
+                model=self._model, messages=messages
+            ),
+            cost,
+            affinity,
+        )
+
+    @classmethod
+    def _parse(cls, stage: str, output_model: type[_Model], content: str) -> _Model:
+        """Разбирает ответ LLM: сначала как чистый JSON, затем через _extract_json.
+
+        Путь разбора учитывается в moderator_llm_parse_total: direct — ответ
+        уже валидный JSON (guided decoding), extracted — понадобилась очистка
+        от think-тегов и markdown, failed — ответ не разобран.
+
+        Args:
+            stage: Этап пайплайна (moderate_resume, check_education)
+            output_model: Модель ожидаемого ответа
+            content: Текст ответа LLM
+
+        Returns:
+            _Model: Провалидированный ответ
+
+        Raises:
+            ValidationError: Если ответ не удалось разобрать ни одним путём
+        """
+        try:
+            result = output_model.model_validate_json(content or "")
+            path = "direct"
+        except ValidationError:
+            try:
+                result = output_model.model_validate_json(cls._extract_json(content))
+                path = "extracted"
+            except ValidationError:
+                LLM_PARSE.labels(stage=stage, path="failed").inc()
+                raise
+        LLM_PARSE.labels(stage=stage, path=path).inc()
+        return result
+
+    async def _parse_or_repair(
+        self, stage: str, output_model: type[_Model], response
+    ) -> _Model:
+        """Разбирает ответ LLM, а при неудаче — чинит его текстовым запросом.
+
+        В запрос на исправление уходят только исходный ответ, ошибки валидации
+        и JSON-схема — без изображений и данных кандидата, поэтому он в разы
+        дешевле повторного прогона этапа. Успешные исправления и сэкономленные
+        токены промпта учитываются в метриках.
+
+        Args:
+            stage: Этап пайплайна (moderate_resume, check_education)
+            output_model: Модель ожидаемого ответа
+            response: Ответ chat.completions этапа
+
+        Returns:
+            _Model: Провалидированный ответ
+
+        Raises:
+            ValidationError: Если ответ не удалось разобрать и исправить
+        """
+        content = response.choices[0].message.content
+        try:
+            with track_stage("json_extraction"):
+                return self._parse(stage, output_model, content)
+        except ValidationError as exc:
+            error = exc
+        for attempt in range(1, self._repair_attempts + 1):
+            logger.warning(
+                "%s unparsable response, repair attempt %d: %s",
+                stage,
+                attempt,
+                error,
+            )
+            with track_stage("json_repair"):
+                repaired = await self._complete(
+                    f"{stage}_repair",
+                    self._repair_messages(output_model, content, error),
+                    output_model,
+                )
+            self._record_usage(f"{stage}_repair", repaired)
+            content = repaired.choices[0].message.content
+            try:
+                result = self._parse(f"{stage}_repair", output_model, content)
+            except ValidationError as exc:
+                error = exc
+                LLM_REPAIRS.labels(stage=stage, result="failed").inc()
+                continue
+            LLM_REPAIRS.labels(stage=stage, result="repaired").inc()
+            if response.usage is not None and repaired.usage is not None:
+                LLM_REPAIR_SAVED_TOKENS.labels(stage=stage).inc(
+                    max(response.usage.prompt_tokens - repaired.usage.prompt_tokens, 0)
+                )
+            return result
+        raise error
+
+    @staticmethod
+    def _repair_messages(
+        output_model: type[BaseModel], content: Optional[str], error: ValidationError
+    ) -> list[dict]:
+        """Собирает текстовый запрос на исправление ответа под JSON-схему.
+
+        Args:
+            output_model: Модель ожидаемого ответа
+            content: Невалидный ответ LLM
+            error: Ошибка валидации ответа
+
+        Returns:
+            list[dict]: Сообщения для chat.completions
+        """
+        errors = "\n".join(
+            f"{'.'.join(map(str, e['loc'])) or '<root>'}: {e['msg']}"
+            for e in error.errors(include_url=False)
+        )
+        schema = json.dumps(output_model.model_json_schema(), ensure_ascii=False)
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "Исправь ответ модели так, чтобы он соответствовал JSON-схеме. "
+                    "Не добавляй сведений, которых нет в ответе: недостающие "
+                    "необязательные поля заполни null. "
+                    "Верни строго валидный JSON без markdown.\n\n"
+                    f"JSON-СХЕМА:\n{schema} /no_think"
+                ),
+            },
+            {
+                "role": "user",
+                "content": (
+                    f"ОШИБКИ:\n{errors}\n\n"
+                    f"ОТВЕТ МОДЕЛИ:\n{(content or '')[-_REPAIR_MAX_CHARS:]}"
+                ),
+            },
+        ]
+
+    def _record_usage(self, stage: str, response) -> None:
+        """Логирует и учитывает в метриках токены ответа LLM.
+
+        Args:
+            stage: Этап пайплайна (moderate_resume, check_education)
+            response: Ответ chat.completions
+        """
+        usage = response.usage
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        logger.info(
+            "%s usage: prompt_tokens=%d cached_tokens=%d completion_tokens=%d",
+            stage,
+            usage.prompt_tokens,
+            cached,
+            usage.completion_tokens,
+        )
+        LLM_TOKENS.labels(model=self._model, stage=stage, kind="prompt").inc(
+            usage.prompt_tokens
+        )
+        LLM_TOKENS.labels(model=self._model, stage=stage, kind="completion").inc(
+            usage.completion_tokens
+        )
+        if details is not None:
+            # бэкенд сообщает о префиксном кэше — учитываем и нулевые попадания
+            LLM_TOKENS.labels(model=self._model, stage=stage, kind="cached").inc(cached)
+
+    @staticmethod
+    def _moderation_messages(rules_text: str, resume_text: str) -> list[dict]:
+        """Собирает сообщения moderate_resume: статический префикс, затем данные.
+
+        Args:
+            rules_text: Правила модерации, по одному на строку
+            resume_text: Текст резюме
+
+        Returns:
+            list[dict]: Сообщения для chat.completions
+        """
+        return [
+            {
+                "role": "system",
+                "content": (
+                    f"{_MODERATION_SYSTEM_PROMPT}\n\nПРАВИЛА МОДЕРАЦИИ:\n{rules_text}"
+                ),
+            },
+            {"role": "user", "content": f"РЕЗЮМЕ:\n{resume_text}"},
+        ]
+
+    @staticmethod
+    def _rejects_response_format(error: BadRequestError) -> bool:
+        """Проверяет, что ошибка 400 вызвана неподдерживаемым response_format.
+
+        Args:
+            error: Ошибка бэкенда
+
+        Returns:
+            bool: True если ошибка относится к response_format/json_schema
+        """
+        if error.param and "response_format" in str(error.param):
+            return True
+        return bool(_RESPONSE_FORMAT_ERROR_RE.search(str(error.message)))
+
+    @staticmethod
+    def _affinity(messages: list[dict]) -> str:
+        """Ключ близости запроса — хэш статического системного сообщения."""
+        return hashlib.sha256(messages[0]["content"].encode()).hexdigest()
+
+    @staticmethod
+    def _education_messages(
+        specialties_text: str, edu_text: str, image_contents: list[dict]
+    ) -> list[dict]:
+        """Собирает сообщения check_education: статический префикс, затем данные.
+
+        Статический префикс — только системный промпт: шорт-лист
+        специальностей подбирается под запрос, поэтому вместе с данными
+        анкеты и страницами документа идёт в пользовательском сообщении.
+
+        Args:
+            specialties_text: Блок специальностей
+            edu_text: Данные из анкеты
+            image_contents: Контент-блоки страниц документа
+
+        Returns:
+            list[dict]: Сообщения для chat.completions
+        """
+        return [
+            {"role": "system", "content": _EDUCATION_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"{specialties_text}\n\n"},
+                    {"type": "text", "text": f"ДАННЫЕ ИЗ АНКЕТЫ:\n{edu_text}"},
+                    *image_contents,
+                ],
+            },
+        ]
+
+    @staticmethod
+    def _canonical_rules(rules: list[Rule]) -> list[list[str]]:
+        """Приводит правила к каноническому виду для ключа кэша.
+
+        Порядок правил и пробельные символы в условиях не влияют на ключ.
+
+        Args:
+            rules: Список правил модерации
+
+        Returns:
+            list[list[str]]: Отсортированные пары [id, условие]
+        """
+        return sorted([r.id, " ".join(r.condition.split())] for r in rules)
+
     @staticmethod
     def _extract_json(text: str) -> str:
         """Извлекает JSON из ответа модели, убирая markdown и think-теги.
@@ -301,18 +1020,15 @@ class LLMService:
         return text
 
     @staticmethod
-    def _page_to_content(page) -> dict:
-        """Конвертирует страницу PDF в base64 image_url для OpenAI API.
+    def _page_to_content(b64: str) -> dict:
+        """Оборачивает base64 JPEG страницы в image_url для OpenAI API.
 
         Args:
-            page: PIL Image объект страницы
+            b64: base64 JPEG страницы (из RenderService)
 
         Returns:
             dict: Контент-блок формата OpenAI vision API
         """
-        buffer = BytesIO()
-        page.save(buffer, format="JPEG")
-        b64 = base64.b64encode(buffer.getvalue()).decode()
         return {
             "type": "image_url",
             "image_url": {"url": f"data:image/jpeg;base64,{b64}"},
@@ -0,0 +1,172 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import Counter, Gauge, Histogram
+
+from service.timings import record_stage
+
+STAGE_SECONDS = Histogram(
+    "moderator_stage_duration_seconds",
+    "Длительность этапов пайплайна отбора",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+RENDER_QUEUE_DEPTH = Gauge(
+    "moderator_render_queue_depth",
+    "Страницы PDF, ожидающие или проходящие рендеринг в пуле процессов",
+)
+
+CACHE_REQUESTS = Counter(
+    "moderator_cache_requests_total",
+    "Обращения к кэшам результатов LLM",
+    ["cache", "result"],
+)
+
+LLM_TOKENS = Counter(
+    "moderator_llm_tokens_total",
+    "Токены запросов и ответов LLM (response.usage)",
+    ["model", "stage", "kind"],
+)
+
+LLM_PARSE = Counter(
+    "moderator_llm_parse_total",
+    "Разбор ответов LLM по пути: direct, extracted или failed",
+    ["stage", "path"],
+)
+
+LLM_REPAIRS = Counter(
+    "moderator_llm_repairs_total",
+    "Текстовые запросы на исправление неразобранных ответов LLM",
+    ["stage", "result"],
+)
+
+LLM_REPAIR_SAVED_TOKENS = Counter(
+    "moderator_llm_repair_saved_prompt_tokens_total",
+    "Токены промпта, сэкономленные исправлением вместо повтора этапа",
+    ["stage"],
+)
+
+LLM_RETRIES = Counter(
+    "moderator_llm_retries_total",
+    "Повторы LLM-запросов после транзиентных ошибок",
+    ["stage"],
+)
+
+LLM_HEDGES = Counter(
+    "moderator_llm_hedged_requests_total",
+    "Дубликаты LLM-запросов: отправленные (sent) и ответившие первыми (won)",
+    ["stage", "result"],
+)
+
+LLM_CIRCUIT_STATE = Gauge(
+    "moderator_llm_circuit_state",
+    "Состояние размыкателя цепи реплики LLM: 0 — closed, 1 — open, 2 — half-open",
+    ["backend"],
+)
+
+LLM_BACKEND_REQUESTS = Counter(
+    "moderator_llm_backend_requests_total",
+    "Запросы к репликам LLM по исходу: ok, error, cancelled",
+    ["backend", "result"],
+)
+
+LLM_BACKEND_DURATION = Histogram(
+    "moderator_llm_backend_duration_seconds",
+    "Длительность запросов к репликам LLM",
+    ["backend"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+LLM_BACKEND_OUTSTANDING = Gauge(
+    "moderator_llm_backend_outstanding_cost",
+    "Суммарная стоимость выполняющихся запросов к реплике LLM",
+    ["backend"],
+)
+
+LLM_POOL_WAIT = Histogram(
+    "moderator_llm_pool_wait_seconds",
+    "Ожидание соединения в пуле HTTP-клиента реплики LLM",
+    ["backend"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+LLM_CONNECTIONS = Counter(
+    "moderator_llm_connections_total",
+    "Запросы к реплике LLM по соединению: new — открыто новое, reused — из пула",
+    ["backend", "kind"],
+)
+
+LLM_BACKEND_HEALTHY = Gauge(
+    "moderator_llm_backend_healthy",
+    "Результат последней проверки здоровья реплики LLM: 1 — здорова",
+    ["backend"],
+)
+
+IMAGE_BYTES = Histogram(
+    "moderator_vlm_image_bytes",
+    "Суммарный размер JPEG страниц в одном запросе к VLM",
+    buckets=(50e3, 100e3, 250e3, 500e3, 1e6, 2e6, 4e6, 8e6),
+)
+
+PAGE_SELECTION = Counter(
+    "moderator_page_selection_total",
+    "Страницы документов по итогам предварительного отбора для VLM",
+    ["result"],
+)
+
+VERIFICATIONS = Counter(
+    "moderator_verification_total",
+    "Исход первой стадии проверки документа: принят или эскалирован",
+    ["outcome"],
+)
+
+PDF_VALIDATIONS = Counter(
+    "moderator_pdf_validations_total",
+    "Результаты структурной проверки загружаемых PDF",
+    ["result"],
+)
+
+ERRORS = Counter(
+    "moderator_errors_total",
+    "Ошибки этапов пайплайна по классу исключения",
+    ["stage", "error"],
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "moderator_requests_in_flight",
+    "HTTP-запросы, обрабатываемые в данный момент",
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Учитывает длительность этапа в гистограмме и в разбивке текущего отбора.
+
+    Args:
+        stage: Название этапа (метка stage)
+        seconds: Длительность в секундах
+    """
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    record_stage(stage, seconds)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Измеряет длительность этапа и считает его ошибки по классу исключения.
+
+    Args:
+        stage: Название этапа (метка stage)
+
+    Example:
+        with track_stage("moderate_resume"):
+            response = await client.chat.completions.create(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        ERRORS.labels(stage=stage, error=type(e).__name__).inc()
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
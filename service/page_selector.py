@@ -0,0 +1,163 @@
+import logging
+import re
+import subprocess
+from typing import NamedTuple
+
+from pdf2image import convert_from_path
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Яркость пикселя (0–255), ниже которой пиксель считается «чернилами»
+_INK_LEVEL = 160
+# Признаки титульной страницы диплома/справки и приложения к нему
+_TITLE_RE = re.compile(
+    r"диплом|бакалавр|магистр|специалист|квалификаци|присвоен|справк|"
+    r"обучается|направлени[ея] подготовки",
+    re.IGNORECASE,
+)
+_APPENDIX_RE = re.compile(
+    r"приложение к диплому|зачтено|отлично|хорошо|удовлетворительно|"
+    r"зачётн|зачетн|з\.\s?е\.|часов",
+    re.IGNORECASE,
+)
+
+
+class PageScore(NamedTuple):
+    """Оценка страницы документа по миниатюре и текстовому слою.
+
+    Args:
+        page_number: Номер страницы (с единицы)
+        ink: Доля «чернильных» пикселей миниатюры
+        contrast: Стандартное отклонение яркости миниатюры (0–1)
+        text_chars: Число символов текстового слоя
+        title_hits: Совпадения с признаками титульной страницы
+        appendix_hits: Совпадения с признаками приложения (оценки, часы)
+        blank: Страница пустая
+        score: Итоговый балл (больше — важнее для VLM)
+    """
+
+    page_number: int
+    ink: float
+    contrast: float
+    text_chars: int
+    title_hits: int
+    appendix_hits: int
+    blank: bool
+    score: float
+
+
+def _text_layer(file_path: str, last_page: int) -> list[str]:
+    """Извлекает текстовый слой первых страниц через pdftotext (poppler).
+
+    Args:
+        file_path: Путь к PDF-файлу
+        last_page: Последняя страница окна
+
+    Returns:
+        list[str]: Текст страниц по порядку; пустой список, если текстового
+            слоя нет или pdftotext недоступен
+    """
+    try:
+        result = subprocess.run(
+            ["pdftotext", "-q", "-f", "1", "-l", str(last_page), file_path, "-"],
+            capture_output=True,
+            timeout=30,
+            check=False,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    return result.stdout.decode("utf-8", errors="replace").split("\f")
+
+
+def _score(
+    page_number: int, thumbnail: Image.Image, text: str, ink_threshold: float
+) -> PageScore:
+    """Оценивает одну страницу.
+
+    Пустая страница — мало «чернил» и нет текстового слоя. Титульная
+    страница поднимается вверх, приложение с оценками опускается, при
+    прочих равных ранние страницы важнее поздних.
+    """
+    gray = thumbnail.convert("L")
+    histogram = gray.histogram()
+    pixels = sum(histogram) or 1
+    ink = sum(histogram[:_INK_LEVEL]) / pixels
+    mean = sum(level * count for level, count in enumerate(histogram)) / pixels
+    variance = (
+        sum(count * (level - mean) ** 2 for level, count in enumerate(histogram))
+        / pixels
+    )
+    contrast = variance**0.5 / 255
+
+    text_chars = len(text.strip())
+    title_hits = len(_TITLE_RE.findall(text))
+    appendix_hits = len(_APPENDIX_RE.findall(text))
+    blank = ink < ink_threshold and text_chars == 0
+
+    score = (
+        2.0 * min(title_hits, 3)
+        - 0.5 * min(appendix_hits, 6)
+        + 5.0 * min(ink, 0.2)
+        + min(contrast, 0.5)
+        - 0.1 * page_number
+    )
+    return PageScore(
+        page_number=page_number,
+        ink=round(ink, 4),
+        contrast=round(contrast, 4),
+        text_chars=text_chars,
+        title_hits=title_hits,
+        appendix_hits=appendix_hits,
+        blank=blank,
+        score=round(score, 3),
+    )
+
+
+def score_pages(
+    file_path: str, window: int, dpi: int, ink_threshold: float
+) -> list[PageScore]:
+    """Оценивает первые window страниц по миниатюрам и текстовому слою.
+
+    Выполняется в процессе пула рендеринга, поэтому функция модульного уровня.
+
+    Args:
+        file_path: Путь к PDF-файлу
+        window: Сколько первых страниц рассматривать
+        dpi: Разрешение миниатюр
+        ink_threshold: Доля «чернил», ниже которой страница без текста пустая
+
+    Returns:
+        list[PageScore]: Оценки страниц по порядку следования
+    """
+    thumbnails = convert_from_path(
+        file_path, dpi=dpi, first_page=1, last_page=window, grayscale=True
+    )
+    texts = _text_layer(file_path, len(thumbnails))
+    return [
+        _score(
+            page_number,
+            thumbnail,
+            texts[page_number - 1] if page_number <= len(texts) else "",
+            ink_threshold,
+        )
+        for page_number, thumbnail in enumerate(thumbnails, start=1)
+    ]
+
+
+def select_pages(scores: list[PageScore], max_pages: int) -> list[int]:
+    """Выбирает страницы для VLM: без пустых, по убыванию балла.
+
+    Args:
+        scores: Оценки страниц
+        max_pages: Сколько страниц отправить
+
+    Returns:
+        list[int]: Номера страниц, самая важная первой; если все страницы
+            пустые — первые max_pages по порядку
+    """
+    candidates = [score for score in scores if not score.blank]
+    if not candidates:
+        return [score.page_number for score in scores[:max_pages]]
+    ranked = sorted(candidates, key=lambda score: score.score, reverse=True)
+    return [score.page_number for score in ranked[:max_pages]]
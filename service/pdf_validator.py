@@ -0,0 +1,515 @@
+import mmap
+import re
+import zlib
+from enum import Enum
+from typing import NamedTuple, Optional
+
+_HEADER_RE = re.compile(rb"%PDF-")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s+%%EOF")
+_OBJ_HEADER_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_XREF_SECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)[ \t]*\r?\n?")
+_XREF_ENTRY_RE = re.compile(rb"\s*(\d{10})\s+(\d{5})\s+([nf])")
+_NUMBER_RE = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_REF_TAIL_RE = re.compile(rb"\s+(\d+)\s+R(?![A-Za-z0-9])")
+_WHITESPACE = b"\x00\t\n\x0c\r "
+_DELIMITERS = b"()<>[]{}/%"
+
+_TAIL_SIZE = 2048
+_MAX_XREF_SECTIONS = 64
+_MAX_PAGES_DEPTH = 32
+# Предел распакованного потока xref/ObjStm: защищает от zip-бомб и долгого
+# снятия предиктора на чистом Python; для реальных документов хватает с запасом
+_MAX_DECODED_SIZE = 1024 * 1024
+
+
+class PdfCheckStatus(str, Enum):
+    """Результат структурной проверки PDF.
+
+    Valid: Структура корректна, найдено дерево страниц
+    Invalid: Файл точно не является пригодным PDF
+    Inconclusive: Структуру не удалось разобрать (шифрование, повреждённая
+        таблица xref, неподдерживаемые фильтры) — нужен полный рендеринг
+    """
+
+    Valid = "Valid"
+    Invalid = "Invalid"
+    Inconclusive = "Inconclusive"
+
+
+class PdfCheck(NamedTuple):
+    """Итог структурной проверки PDF.
+
+    Args:
+        status: Результат проверки
+        page_count: Число страниц по дереву страниц (None если не определено)
+        encrypted: В trailer есть /Encrypt
+        reason: Пояснение для Invalid/Inconclusive
+    """
+
+    status: PdfCheckStatus
+    page_count: Optional[int] = None
+    encrypted: bool = False
+    reason: str = ""
+
+
+class _Ref(NamedTuple):
+    """Ссылка на косвенный объект PDF (N G R)."""
+
+    num: int
+    gen: int
+
+
+class _Name(str):
+    """Имя PDF (/Name) без ведущего слэша."""
+
+
+class _Stream(NamedTuple):
+    """Поток PDF: словарь потока и сырые (не декодированные) данные."""
+
+    header: dict
+    data: bytes
+
+
+class _Unsupported(Exception):
+    """Конструкция PDF, которую структурная проверка не разбирает."""
+
+
+def validate_pdf(path: str) -> PdfCheck:
+    """Проверяет структуру PDF без рендеринга.
+
+    Читает заголовок, startxref, таблицы/потоки xref (с цепочкой /Prev),
+    trailer, каталог и корень дерева страниц. Файл отображается в память
+    через mmap, поэтому читаются только нужные участки.
+
+    Args:
+        path: Путь к PDF-файлу
+
+    Returns:
+        PdfCheck: Результат проверки; Inconclusive означает, что решение
+            нужно принимать по полному рендерингу
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return PdfCheck(PdfCheckStatus.Invalid, reason="empty file")
+        with data:
+            try:
+                return _Document(data).check()
+            except (
+                _Unsupported,
+                ValueError,
+                TypeError,
+                IndexError,
+                KeyError,
+                zlib.error,
+            ) as e:
+                return PdfCheck(PdfCheckStatus.Inconclusive, reason=str(e))
+            except RecursionError:
+                return PdfCheck(PdfCheckStatus.Inconclusive, reason="nesting too deep")
+
+
+class _Document:
+    """Разбор минимально необходимой структуры PDF."""
+
+    def __init__(self, data) -> None:
+        self._data = data
+        self._base = 0
+        self._xref: dict[int, tuple] = {}
+        self._object_streams: dict[int, tuple[bytes, list[tuple[int, int]]]] = {}
+
+    def check(self) -> PdfCheck:
+        header = _HEADER_RE.search(self._data, 0, 1024)
+        if header is None:
+            return PdfCheck(PdfCheckStatus.Invalid, reason="no %PDF- header")
+        self._base = header.start()
+
+        tail_start = max(0, len(self._data) - _TAIL_SIZE)
+        matches = list(_STARTXREF_RE.finditer(self._data, tail_start))
+        if not matches:
+            return PdfCheck(PdfCheckStatus.Inconclusive, reason="no startxref/%%EOF")
+
+        trailer = self._read_xref_chain(int(matches[-1].group(1)))
+        if "Encrypt" in trailer:
+            return PdfCheck(
+                PdfCheckStatus.Inconclusive, encrypted=True, reason="encrypted"
+            )
+
+        catalog = self._resolve(trailer.get("Root"))
+        if not isinstance(catalog, dict):
+            return PdfCheck(PdfCheckStatus.Inconclusive, reason="no catalog")
+        pages = self._resolve(catalog.get("Pages"))
+        if not isinstance(pages, dict):
+            return PdfCheck(PdfCheckStatus.Inconclusive, reason="no page tree")
+
+        count = self._resolve(pages.get("Count"))
+        if not isinstance(count, int):
+            return PdfCheck(PdfCheckStatus.Inconclusive, reason="no page count")
+        if count < 1:
+            return PdfCheck(PdfCheckStatus.Invalid, page_count=0, reason="no pages")
+        if not self._has_leaf(pages, 0):
+            return PdfCheck(PdfCheckStatus.Inconclusive, reason="no page leaf")
+        return PdfCheck(PdfCheckStatus.Valid, page_count=count)
+
+    def _has_leaf(self, node: dict, depth: int) -> bool:
+        """Проверяет, что от корня дерева страниц достижима хотя бы одна страница."""
+        if depth > _MAX_PAGES_DEPTH:
+            return False
+        if node.get("Type") == "Page" or "Kids" not in node:
+            return node.get("Type") == "Page"
+        kids = self._resolve(node["Kids"])
+        if not isinstance(kids, list) or not kids:
+            return False
+        child = self._resolve(kids[0])
+        return isinstance(child, dict) and self._has_leaf(child, depth + 1)
+
+    def _read_xref_chain(self, offset: int) -> dict:
+        """Читает все секции xref по цепочке /Prev.
+
+        Более новые секции имеют приоритет над старыми.
+
+        Returns:
+            dict: Trailer самой новой секции
+        """
+        newest = None
+        seen = set()
+        while offset is not None and len(seen) < _MAX_XREF_SECTIONS:
+            if offset in seen:
+                break
+            seen.add(offset)
+            trailer = self._read_xref_section(offset)
+            if newest is None:
+                newest = trailer
+            if isinstance(trailer.get("XRefStm"), int):
+                self._read_xref_section(trailer["XRefStm"])
+            prev = trailer.get("Prev")
+            offset = prev if isinstance(prev, int) else None
+        return newest
+
+    def _read_xref_section(self, offset: int) -> dict:
+        """Читает одну секцию xref: классическую таблицу или поток /XRef."""
+        position = self._locate(offset, (b"xref", _OBJ_HEADER_RE))
+        if self._data[position : position + 4] == b"xref":
+            return self._read_xref_table(position + 4)
+
+        stream = self._read_indirect(position)
+        if not isinstance(stream, _Stream) or stream.header.get("Type") != "XRef":
+            raise _Unsupported("startxref does not point to xref")
+        self._read_xref_stream(stream)
+        return stream.header
+
+    def _read_xref_table(self, position: int) -> dict:
+        """Читает классическую таблицу xref и следующий за ней trailer."""
+        data = self._data
+        while True:
+            section = _XREF_SECTION_RE.match(data, position)
+            if section is None:
+                break
+            start, count = int(section.group(1)), int(section.group(2))
+            position = section.end()
+            for num in range(start, start + count):
+                entry = _XREF_ENTRY_RE.match(data, position)
+                if entry is None:
+                    raise _Unsupported("malformed xref entry")
+                position = entry.end()
+                if entry.group(3) == b"n":
+                    self._xref.setdefault(num, ("offset", int(entry.group(1))))
+
+        parser = _Parser(data, position)
+        if not parser.keyword(b"trailer"):
+            raise _Unsupported("no trailer")
+        trailer = parser.parse()
+        if not isinstance(trailer, dict):
+            raise _Unsupported("malformed trailer")
+        return trailer
+
+    def _read_xref_stream(self, stream: _Stream) -> None:
+        """Читает записи потока xref (PDF 1.5+)."""
+        widths = stream.header.get("W")
+        if not isinstance(widths, list) or len(widths) != 3:
+            raise _Unsupported("malformed /W")
+        size = stream.header.get("Size", 0)
+        index = stream.header.get("Index", [0, size])
+        rows = self._decode(stream)
+        row_size = sum(widths)
+
+        position = 0
+        for start, count in zip(index[::2], index[1::2]):
+            for num in range(start, start + count):
+                row = rows[position : position + row_size]
+                if len(row) < row_size:
+                    return
+                position += row_size
+                fields = []
+                cursor = 0
+                for width in widths:
+                    fields.append(int.from_bytes(row[cursor : cursor + width], "big"))
+                    cursor += width
+                kind = fields[0] if widths[0] else 1
+                if kind == 1:
+                    self._xref.setdefault(num, ("offset", fields[1]))
+                elif kind == 2:
+                    self._xref.setdefault(num, ("compressed", fields[1], fields[2]))
+
+    def _resolve(self, value, depth: int = 0):
+        """Разыменовывает ссылку на косвенный объект."""
+        while isinstance(value, _Ref):
+            if depth > 16:
+                raise _Unsupported("reference chain too long")
+            depth += 1
+            entry = self._xref.get(value.num)
+            if entry is None:
+                return None
+            if entry[0] == "offset":
+                value = self._read_indirect(
+                    self._locate(entry[1], (_OBJ_HEADER_RE,)), value.num
+                )
+            else:
+                value = self._read_compressed(entry[1], entry[2])
+        return value
+
+    def _read_indirect(self, position: int, expected: Optional[int] = None):
+        """Читает косвенный объект "N G obj ... endobj" по смещению."""
+        header = _OBJ_HEADER_RE.match(self._data, position)
+        if header is None:
+            raise _Unsupported("no object at offset")
+        if expected is not None and int(header.group(1)) != expected:
+            raise _Unsupported("xref offset points to another object")
+
+        parser = _Parser(self._data, header.end())
+        value = parser.parse()
+        if isinstance(value, dict) and parser.keyword(b"stream"):
+            return _Stream(value, self._stream_data(value, parser.position))
+        return value
+
+    def _stream_data(self, stream_dict: dict, position: int) -> bytes:
+        """Возвращает сырые данные потока, начиная после ключевого слова stream."""
+        data = self._data
+        if data[position : position + 2] == b"\r\n":
+            position += 2
+        elif data[position : position + 1] in (b"\n", b"\r"):
+            position += 1
+        length = stream_dict.get("Length")
+        if isinstance(length, int) and data[
+            position + length : position + length + 32
+        ].lstrip().startswith(b"endstream"):
+            return data[position : position + length]
+        end = data.find(b"endstream", position)
+        if end == -1:
+            raise _Unsupported("unterminated stream")
+        return data[position:end].rstrip(b"\r\n")
+
+    def _read_compressed(self, stream_num: int, index: int):
+        """Читает объект из потока объектов /ObjStm."""
+        if stream_num not in self._object_streams:
+            stream = self._resolve(_Ref(stream_num, 0))
+            if not isinstance(stream, _Stream) or stream.header.get("Type") != "ObjStm":
+                raise _Unsupported("broken object stream")
+            content = self._decode(stream)
+            header = _Parser(content, 0)
+            pairs = [
+                (header.parse(), header.parse())
+                for _ in range(stream.header.get("N", 0))
+            ]
+            first = stream.header.get("First", 0)
+            self._object_streams[stream_num] = (content[first:], pairs)
+
+        content, pairs = self._object_streams[stream_num]
+        if index >= len(pairs):
+            raise _Unsupported("object index out of range")
+        return _Parser(content, pairs[index][1]).parse()
+
+    def _decode(self, stream: _Stream) -> bytes:
+        """Декодирует поток с фильтром FlateDecode и PNG-предиктором.
+
+        Распакованные данные ограничены _MAX_DECODED_SIZE байт, сверх
+        предела поток считается неподдерживаемым (Inconclusive).
+        """
+        filters = stream.header.get("Filter")
+        params = stream.header.get("DecodeParms")
+        if isinstance(filters, list):
+            if len(filters) > 1:
+                raise _Unsupported("filter chains are not supported")
+            filters = filters[0] if filters else None
+            params = params[0] if isinstance(params, list) and params else params
+        if filters is None:
+            return bytes(stream.data)
+        if filters != "FlateDecode":
+            raise _Unsupported(f"unsupported filter {filters}")
+
+        decompressor = zlib.decompressobj()
+        data = decompressor.decompress(stream.data, _MAX_DECODED_SIZE)
+        if decompressor.unconsumed_tail or len(data) >= _MAX_DECODED_SIZE:
+            raise _Unsupported("decoded stream is too large")
+        if not isinstance(params, dict) or params.get("Predictor", 1) < 10:
+            return data
+        return _png_unpredict(data, params.get("Columns", 1))
+
+    def _locate(self, offset: int, patterns) -> int:
+        """Находит объект по смещению xref с учётом мусора перед заголовком."""
+        for position in dict.fromkeys((offset, offset + self._base)):
+            for pattern in patterns:
+                if isinstance(pattern, bytes):
+                    if self._data[position : position + len(pattern)] == pattern:
+                        return position
+                elif pattern.match(self._data, position):
+                    return position
+        raise _Unsupported("xref offset is out of place")
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """Снимает PNG-предиктор (Predictor >= 10) с однобайтовыми сэмплами."""
+    row_size = columns + 1
+    previous = bytearray(columns)
+    output = bytearray()
+    for start in range(0, len(data) - row_size + 1, row_size):
+        kind = data[start]
+        row = bytearray(data[start + 1 : start + row_size])
+        for i in range(columns):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + ((left + up) >> 1)) & 0xFF
+            elif kind == 4:
+                upper_left = previous[i - 1] if i else 0
+                estimate = left + up - upper_left
+                pa, pb, pc = (
+                    abs(estimate - left),
+                    abs(estimate - up),
+                    abs(estimate - upper_left),
+                )
+                if pa <= pb and pa <= pc:
+                    row[i] = (row[i] + left) & 0xFF
+                elif pb <= pc:
+                    row[i] = (row[i] + up) & 0xFF
+                else:
+                    row[i] = (row[i] + upper_left) & 0xFF
+            elif kind != 0:
+                raise _Unsupported(f"unknown PNG predictor {kind}")
+        output += row
+        previous = row
+    return bytes(output)
+
+
+class _Parser:
+    """Минимальный парсер объектов PDF: словари, массивы, имена, числа,
+    строки, ссылки и ключевые слова."""
+
+    def __init__(self, data, position: int) -> None:
+        self._data = data
+        self.position = position
+
+    def keyword(self, word: bytes) -> bool:
+        """Пропускает ключевое слово, если оно следует далее."""
+        self._skip()
+        if self._data[self.position : self.position + len(word)] == word:
+            self.position += len(word)
+            return True
+        return False
+
+    def parse(self):
+        """Разбирает следующий объект."""
+        self._skip()
+        data = self._data
+        char = data[self.position : self.position + 1]
+        if not char:
+            raise _Unsupported("unexpected end of data")
+
+        if data[self.position : self.position + 2] == b"<<":
+            self.position += 2
+            result = {}
+            while not self.keyword(b">>"):
+                key = self.parse()
+                if not isinstance(key, _Name):
+                    raise _Unsupported("dictionary key is not a name")
+                result[key] = self.parse()
+            return result
+        if char == b"[":
+            self.position += 1
+            items = []
+            while not self.keyword(b"]"):
+                items.append(self.parse())
+            return items
+        if char == b"/":
+            return _Name(self._token(self.position + 1).decode("latin-1"))
+        if char == b"<":
+            end = data.find(b">", self.position)
+            if end == -1:
+                raise _Unsupported("unterminated hex string")
+            self.position = end + 1
+            return b""
+        if char == b"(":
+            return self._literal_string()
+
+        number = _NUMBER_RE.match(data, self.position)
+        if number is not None:
+            self.position = number.end()
+            text = number.group()
+            if b"." in text:
+                return float(text)
+            ref = _REF_TAIL_RE.match(data, self.position)
+            if ref is not None:
+                self.position = ref.end()
+                return _Ref(int(text), int(ref.group(1)))
+            return int(text)
+
+        token = self._token(self.position)
+        if token == b"true":
+            return True
+        if token == b"false":
+            return False
+        if token == b"null":
+            return None
+        raise _Unsupported(f"unexpected token {token[:16]!r}")
+
+    def _literal_string(self) -> bytes:
+        """Пропускает литеральную строку с учётом вложенных скобок и экранирования."""
+        data = self._data
+        depth = 0
+        position = self.position
+        while position < len(data):
+            char = data[position]
+            if char == 0x5C:  # backslash
+                position += 2
+                continue
+            if char == 0x28:
+                depth += 1
+            elif char == 0x29:
+                depth -= 1
+                if depth == 0:
+                    self.position = position + 1
+                    return b""
+            position += 1
+        raise _Unsupported("unterminated string")
+
+    def _token(self, start: int) -> bytes:
+        """Читает регулярный токен до пробела или разделителя."""
+        data = self._data
+        end = start
+        while (
+            end < len(data)
+            and data[end] not in _WHITESPACE
+            and data[end] not in _DELIMITERS
+        ):
+            end += 1
+        self.position = end
+        return bytes(data[start:end])
+
+    def _skip(self) -> None:
+        """Пропускает пробельные символы и комментарии."""
+        data = self._data
+        position = self.position
+        while position < len(data):
+            char = data[position]
+            if char in _WHITESPACE:
+                position += 1
+            elif char == 0x25:  # %
+                while position < len(data) and data[position] not in b"\r\n":
+                    position += 1
+            else:
+                break
+        self.position = position
@@ -0,0 +1,540 @@
+import asyncio
+import base64
+import glob
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import NamedTuple, Optional
+
+from pdf2image import convert_from_path
+from PIL import Image
+
+from configs.settings import Settings
+from service.metrics import (
+    IMAGE_BYTES,
+    PAGE_SELECTION,
+    RENDER_QUEUE_DEPTH,
+    observe_stage,
+    track_stage,
+)
+from service.page_selector import score_pages, select_pages
+
+logger = logging.getLogger(__name__)
+
+_MAX_PAGES = 3
+# Сколько раз ужимать страницы под бюджет запроса, прежде чем отдать как есть
+_BUDGET_ATTEMPTS = 3
+# Сколько ранжирований страниц держать в памяти (LRU)
+_SELECTION_CACHE_SIZE = 1024
+
+
+class ImageProfile(NamedTuple):
+    """Бюджет изображения страницы для VLM.
+
+    Args:
+        max_long_edge: Максимальная длинная сторона в пикселях (0 — без ограничения)
+        max_megapixels: Максимум мегапикселей (0 — без ограничения)
+        jpeg_quality: Качество JPEG (1–95)
+        grayscale: Кодировать в оттенках серого
+        max_request_bytes: Бюджет JPEG всех страниц одного запроса в байтах
+            (0 — без ограничения); при превышении страницы уменьшаются
+    """
+
+    max_long_edge: int = 0
+    max_megapixels: float = 0
+    jpeg_quality: int = 75
+    grayscale: bool = False
+    max_request_bytes: int = 0
+
+    @property
+    def tag(self) -> str:
+        """Метка профиля для имени директории предрендеренных страниц."""
+        return (
+            f"e{self.max_long_edge}-mp{self.max_megapixels:g}-q{self.jpeg_quality}"
+            f"{'-g' if self.grayscale else ''}"
+        )
+
+
+def _fit_scale(size: tuple[int, int], profile: ImageProfile) -> float:
+    """Коэффициент уменьшения изображения под ограничения профиля (не больше 1)."""
+    width, height = size
+    scale = 1.0
+    if profile.max_long_edge:
+        scale = min(scale, profile.max_long_edge / max(width, height))
+    if profile.max_megapixels:
+        scale = min(scale, math.sqrt(profile.max_megapixels * 1e6 / (width * height)))
+    return scale
+
+
+def _encode(image: Image.Image, profile: ImageProfile, scale: float = 1.0) -> bytes:
+    """Приводит изображение к профилю и кодирует в JPEG.
+
+    Args:
+        image: Изображение страницы
+        profile: Бюджет изображения
+        scale: Дополнительный коэффициент уменьшения (бюджет запроса)
+
+    Returns:
+        bytes: JPEG
+    """
+    image = image.convert("L" if profile.grayscale else "RGB")
+    scale = min(scale, _fit_scale(image.size, profile))
+    if scale < 1:
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS,
+        )
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=profile.jpeg_quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _shrink(jpeg: bytes, scale: float, profile: ImageProfile) -> bytes:
+    """Уменьшает JPEG страницы в scale раз по каждой стороне.
+
+    Выполняется в процессе пула, поэтому функция модульного уровня.
+
+    Args:
+        jpeg: JPEG страницы
+        scale: Коэффициент уменьшения (меньше 1)
+        profile: Бюджет изображения
+
+    Returns:
+        bytes: Уменьшенный JPEG
+    """
+    with Image.open(BytesIO(jpeg)) as image:
+        return _encode(image, profile, scale)
+
+
+def _rasterize(
+    file_path: str, page_number: int, dpi: int, profile: ImageProfile
+) -> Optional[tuple[bytes, float, float]]:
+    """Рендерит одну страницу PDF в JPEG в рамках бюджета изображения.
+
+    Выполняется в процессе пула, поэтому функция модульного уровня.
+
+    Args:
+        file_path: Путь к PDF-файлу
+        page_number: Номер страницы (с единицы)
+        dpi: Разрешение рендеринга
+        profile: Бюджет изображения
+
+    Returns:
+        Optional[tuple[bytes, float, float]]: JPEG, время растеризации и время
+            кодирования в секундах; None если страницы нет в документе
+    """
+    start = time.perf_counter()
+    pages = convert_from_path(
+        file_path, dpi=dpi, first_page=page_number, last_page=page_number
+    )
+    if not pages:
+        return None
+    rendered = time.perf_counter()
+
+    jpeg = _encode(pages[0], profile)
+    return jpeg, rendered - start, time.perf_counter() - rendered
+
+
+def _to_base64(pages: list[bytes]) -> tuple[list[str], float]:
+    """Кодирует JPEG страниц в base64.
+
+    Выполняется в процессе пула, поэтому функция модульного уровня.
+
+    Args:
+        pages: JPEG страниц
+
+    Returns:
+        tuple[list[str], float]: base64 страниц и время кодирования в секундах
+    """
+    start = time.perf_counter()
+    images = [base64.b64encode(jpeg).decode() for jpeg in pages]
+    return images, time.perf_counter() - start
+
+
+def _prerender_page(
+    file_path: str, page_number: int, dpi: int, profile: ImageProfile, out_path: str
+) -> Optional[tuple[float, float]]:
+    """Рендерит страницу PDF в JPEG-файл out_path.
+
+    Выполняется в процессе пула, поэтому функция модульного уровня.
+
+    Args:
+        file_path: Путь к PDF-файлу
+        page_number: Номер страницы (с единицы)
+        dpi: Разрешение рендеринга
+        profile: Бюджет изображения
+        out_path: Путь к JPEG-файлу
+
+    Returns:
+        Optional[tuple[float, float]]: Время растеризации и кодирования
+            в секундах; None если страницы нет в документе
+    """
+    result = _rasterize(file_path, page_number, dpi, profile)
+    if result is None:
+        return None
+    jpeg, render_seconds, encode_seconds = result
+    with open(out_path, "wb") as f:
+        f.write(jpeg)
+    return render_seconds, encode_seconds
+
+
+def _pages_dir(file_path: str, dpi: int, profile: ImageProfile, window: int) -> str:
+    """Директория предрендеренных страниц рядом с PDF."""
+    return f"{file_path}.pages-{dpi}-{profile.tag}-w{window}"
+
+
+def _read_pages(pages_dir: str) -> list[bytes]:
+    """Читает предрендеренные JPEG-страницы.
+
+    Args:
+        pages_dir: Директория с файлами <ранг>.jpg
+
+    Returns:
+        list[bytes]: JPEG страниц по убыванию важности
+    """
+    names = sorted(
+        (name for name in os.listdir(pages_dir) if name.endswith(".jpg")),
+        key=lambda name: int(name.removesuffix(".jpg")),
+    )
+    images = []
+    for name in names:
+        with open(os.path.join(pages_dir, name), "rb") as f:
+            images.append(f.read())
+    return images
+
+
+class RenderService:
+    """Сервис рендеринга PDF-страниц в отдельном пуле процессов.
+
+    Растеризация (poppler), JPEG-кодирование и base64 выполняются вне
+    event loop; страницы одного документа рендерятся параллельно.
+    Какие страницы отправлять, решает предварительный проход по миниатюрам
+    первых page_selection_window страниц: пустые отбрасываются, титульная
+    страница идёт первой.
+    Страницы загруженных документов заранее рендерятся в фоне
+    (prerender) и сохраняются рядом с PDF, render читает их с диска.
+
+    Args:
+        settings: Настройки приложения (render_workers, render_dpi,
+            бюджет изображений render_*, выбор страниц page_*)
+
+    Example:
+        service = RenderService(settings)
+        service.prerender("/app/storage/Diploma.pdf")
+        images = await service.render("/app/storage/Diploma.pdf")
+        service.close()
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._dpi = settings.render_dpi
+        self._profile = ImageProfile(
+            max_long_edge=settings.render_max_long_edge,
+            max_megapixels=settings.render_max_megapixels,
+            jpeg_quality=settings.render_jpeg_quality,
+            grayscale=settings.render_grayscale,
+            max_request_bytes=settings.render_max_request_bytes,
+        )
+        self._executor = ProcessPoolExecutor(
+            max_workers=settings.render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._selection_window = settings.page_selection_window
+        self._thumbnail_dpi = settings.page_thumbnail_dpi
+        self._blank_ink_threshold = settings.page_blank_ink_threshold
+        self._prerender_tasks: dict[str, asyncio.Task] = {}
+        self._selections: OrderedDict[str, list[int]] = OrderedDict()
+
+    async def render(
+        self,
+        file_path: str,
+        dpi: Optional[int] = None,
+        max_pages: Optional[int] = None,
+    ) -> list[str]:
+        """Рендерит выбранные страницы документа в base64 JPEG.
+
+        Сначала используются страницы, предрендеренные при загрузке; рендеринг
+        выполняется только при промахе. Для меньшего разрешения или числа
+        страниц (первая стадия проверки) берутся старшие по рангу
+        предрендеренные страницы, уменьшенные в dpi / render_dpi раз.
+        Страницы укладываются в бюджет изображения (длинная сторона,
+        мегапиксели, качество, оттенки серого) и в общий бюджет байт
+        запроса — при превышении страницы уменьшаются.
+
+        Args:
+            file_path: Путь к PDF-файлу
+            dpi: Разрешение рендеринга (по умолчанию render_dpi)
+            max_pages: Максимальное число страниц (по умолчанию _MAX_PAGES)
+
+        Returns:
+            list[str]: base64 JPEG страниц, самая важная первой
+        """
+        dpi = dpi or self._dpi
+        max_pages = max_pages or _MAX_PAGES
+        pages: list[bytes] = []
+        if dpi <= self._dpi and max_pages <= _MAX_PAGES:
+            pages = (await self._load_prerendered(file_path))[:max_pages]
+            if pages and dpi < self._dpi:
+                pages = await asyncio.gather(
+                    *(
+                        self._submit(_shrink, jpeg, dpi / self._dpi, self._profile)
+                        for jpeg in pages
+                    )
+                )
+            if pages:
+                logger.debug("render: prerendered hit, file=%r dpi=%d", file_path, dpi)
+
+        if not pages:
+            page_numbers = await self.select(file_path, max_pages)
+            start = time.perf_counter()
+            results = await asyncio.gather(
+                *(
+                    self._submit(_rasterize, file_path, page_number, dpi, self._profile)
+                    for page_number in page_numbers
+                )
+            )
+            for result in results:
+                if result is None:
+                    continue
+                jpeg, render_seconds, encode_seconds = result
+                observe_stage("rasterization", render_seconds)
+                observe_stage("encoding", encode_seconds)
+                pages.append(jpeg)
+            logger.debug(
+                "render: file=%r pages=%d dpi=%d took=%.3fs",
+                file_path,
+                len(pages),
+                dpi,
+                time.perf_counter() - start,
+            )
+
+        pages = await self._fit_budget(pages)
+        images, encode_seconds = await self._submit(_to_base64, pages)
+        observe_stage("encoding", encode_seconds)
+
+        jpeg_bytes = sum(len(jpeg) for jpeg in pages)
+        IMAGE_BYTES.observe(jpeg_bytes)
+        logger.info(
+            "render: file=%r pages=%d jpeg_bytes=%d base64_bytes=%d profile=%s",
+            file_path,
+            len(images),
+            jpeg_bytes,
+            sum(len(b64) for b64 in images),
+            self._profile.tag,
+        )
+        return images
+
+    async def select(self, file_path: str, max_pages: int) -> list[int]:
+        """Выбирает страницы документа для VLM.
+
+        Оценивает первые page_selection_window страниц по миниатюрам и
+        текстовому слою (см. page_selector), отбрасывает пустые и ранжирует
+        титульную страницу первой. Ранжирование кэшируется до discard()
+        в LRU на _SELECTION_CACHE_SIZE документов: документы, удалённые
+        другим процессом, вытесняются из кэша сами.
+
+        Args:
+            file_path: Путь к PDF-файлу
+            max_pages: Сколько страниц выбрать
+
+        Returns:
+            list[int]: Номера страниц, самая важная первой
+        """
+        if self._selection_window <= 0:
+            return list(range(1, max_pages + 1))
+
+        ranked = self._selections.get(file_path)
+        if ranked is not None:
+            self._selections.move_to_end(file_path)
+        else:
+            try:
+                with track_stage("page_selection"):
+                    scores = await self._submit(
+                        score_pages,
+                        file_path,
+                        max(self._selection_window, max_pages),
+                        self._thumbnail_dpi,
+                        self._blank_ink_threshold,
+                    )
+            except Exception:
+                logger.warning(
+                    "select: page scoring failed, file=%r", file_path, exc_info=True
+                )
+                return list(range(1, max_pages + 1))
+            ranked = select_pages(scores, len(scores))
+            self._selections[file_path] = ranked
+            while len(self._selections) > _SELECTION_CACHE_SIZE:
+                self._selections.popitem(last=False)
+            blank = sum(score.blank for score in scores)
+            PAGE_SELECTION.labels(result="blank").inc(blank)
+            logger.info(
+                "select: file=%r pages=%d blank=%d ranked=%s scores=%s",
+                file_path,
+                len(scores),
+                blank,
+                ranked,
+                [(score.page_number, score.score) for score in scores],
+            )
+
+        selected = ranked[:max_pages]
+        PAGE_SELECTION.labels(result="selected").inc(len(selected))
+        PAGE_SELECTION.labels(result="skipped").inc(len(ranked) - len(selected))
+        return selected
+
+    async def _fit_budget(self, pages: list[bytes]) -> list[bytes]:
+        """Уменьшает страницы, пока их суммарный размер не уложится в бюджет.
+
+        Размер JPEG примерно пропорционален площади, поэтому стороны
+        уменьшаются в sqrt(бюджет / размер) раз с небольшим запасом.
+
+        Args:
+            pages: JPEG страниц
+
+        Returns:
+            list[bytes]: JPEG страниц в пределах max_request_bytes (или после
+                _BUDGET_ATTEMPTS попыток)
+        """
+        budget = self._profile.max_request_bytes
+        total = sum(len(jpeg) for jpeg in pages)
+        if not budget or total <= budget:
+            return pages
+
+        original = total
+        for _ in range(_BUDGET_ATTEMPTS):
+            scale = math.sqrt(budget / total) * 0.95
+            pages = await asyncio.gather(
+                *(self._submit(_shrink, jpeg, scale, self._profile) for jpeg in pages)
+            )
+            total = sum(len(jpeg) for jpeg in pages)
+            if total <= budget:
+                break
+        logger.info(
+            "render: downscaled to request budget %d -> %d bytes (budget %d)",
+            original,
+            total,
+            budget,
+        )
+        return pages
+
+    def prerender(self, file_path: str) -> None:
+        """Запускает фоновый рендеринг страниц документа на диск.
+
+        Args:
+            file_path: Путь к сохранённому PDF-файлу
+        """
+        if file_path in self._prerender_tasks:
+            return
+        task = asyncio.create_task(self._prerender(file_path))
+        self._prerender_tasks[file_path] = task
+        task.add_done_callback(
+            lambda done: (
+                self._prerender_tasks.pop(file_path)
+                if self._prerender_tasks.get(file_path) is done
+                else None
+            )
+        )
+
+    def discard(self, file_path: str) -> None:
+        """Отменяет фоновый рендеринг и удаляет страницы документа с диска.
+
+        Args:
+            file_path: Путь к PDF-файлу
+        """
+        task = self._prerender_tasks.pop(file_path, None)
+        if task is not None:
+            task.cancel()
+        self._selections.pop(file_path, None)
+        for pages_dir in glob.glob(glob.escape(file_path) + ".pages-*"):
+            shutil.rmtree(pages_dir, ignore_errors=True)
+
+    async def _prerender(self, file_path: str) -> None:
+        """Рендерит страницы документа во временную директорию и атомарно
+        переименовывает её в директорию предрендеренных страниц.
+
+        Args:
+            file_path: Путь к PDF-файлу
+        """
+        pages_dir = self._pages_dir(file_path)
+        if os.path.isdir(pages_dir):
+            return
+        tmp_dir = f"{pages_dir}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_dir)
+        try:
+            page_numbers = await self.select(file_path, _MAX_PAGES)
+            results = await asyncio.gather(
+                *(
+                    self._submit(
+                        _prerender_page,
+                        file_path,
+                        page_number,
+                        self._dpi,
+                        self._profile,
+                        os.path.join(tmp_dir, f"{rank}.jpg"),
+                    )
+                    for rank, page_number in enumerate(page_numbers)
+                )
+            )
+            for result in results:
+                if result is not None:
+                    observe_stage("rasterization", result[0])
+                    observe_stage("encoding", result[1])
+            os.replace(tmp_dir, pages_dir)
+            logger.debug("prerender: done, file=%r", file_path)
+        except Exception:
+            logger.warning("prerender failed: file=%r", file_path, exc_info=True)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    async def _load_prerendered(self, file_path: str) -> list[bytes]:
+        """Возвращает предрендеренные страницы, дожидаясь фонового рендеринга.
+
+        Args:
+            file_path: Путь к PDF-файлу
+
+        Returns:
+            list[bytes]: JPEG страниц или пустой список при промахе
+        """
+        task = self._prerender_tasks.get(file_path)
+        if task is not None:
+            await asyncio.wait({task})
+        pages_dir = self._pages_dir(file_path)
+        if not os.path.isdir(pages_dir):
+            return []
+        try:
+            return await asyncio.to_thread(_read_pages, pages_dir)
+        except OSError:
+            return []
+
+    def _pages_dir(self, file_path: str) -> str:
+        """Директория предрендеренных страниц для текущих настроек."""
+        return _pages_dir(file_path, self._dpi, self._profile, self._selection_window)
+
+    async def _submit(self, func, *args):
+        """Отправляет задачу в пул процессов с учётом глубины очереди.
+
+        Args:
+            func: Функция модульного уровня для выполнения в пуле
+            *args: Аргументы функции
+
+        Returns:
+            Результат функции
+        """
+        RENDER_QUEUE_DEPTH.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, func, *args
+            )
+        finally:
+            RENDER_QUEUE_DEPTH.dec()
+
+    def close(self) -> None:
+        """Останавливает пул процессов рендеринга."""
+        for task in self._prerender_tasks.values():
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
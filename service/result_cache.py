@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from service.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class ResultCache(Generic[M]):
+    """Кэш результатов LLM-вызовов: LRU+TTL в памяти и опциональный SQLite.
+
+    При промахе в памяти запись ищется в SQLite и поднимается в память.
+    Обращения учитываются в метрике moderator_cache_requests_total.
+
+    Args:
+        name: Имя кэша (метка метрик и пространство ключей в SQLite)
+        model: Pydantic-модель хранимого результата
+        max_entries: Максимум записей в памяти
+        ttl: Время жизни записи в секундах
+        db_path: Путь к SQLite-файлу (пустая строка — только память)
+
+    Example:
+        cache = ResultCache("education", EducationInfo, 1024, 86400)
+        key = ResultCache.make_key(document_id, resume_fullname, model)
+        if (info := await cache.get(key)) is None:
+            info = await compute()
+            await cache.set(key, info)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: type[M],
+        max_entries: int,
+        ttl: float,
+        db_path: str = "",
+    ) -> None:
+        self._name = name
+        self._model = model
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._db_path = db_path
+        self._entries: OrderedDict[str, tuple[float, M]] = OrderedDict()
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            with closing(sqlite3.connect(db_path)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                    "value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                    "PRIMARY KEY (namespace, key))"
+                )
+                conn.execute(
+                    "DELETE FROM results WHERE namespace = ? AND expires_at < ?",
+                    (name, time.time()),
+                )
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Строит ключ кэша как SHA-256 от канонического JSON частей ключа.
+
+        Args:
+            *parts: JSON-сериализуемые части ключа
+
+        Returns:
+            str: Хэш ключа
+        """
+        payload = json.dumps(
+            parts, ensure_ascii=False, sort_keys=True, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[M]:
+        """Возвращает результат по ключу или None при промахе.
+
+        Args:
+            key: Ключ кэша
+
+        Returns:
+            Optional[M]: Закэшированный результат
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.labels(cache=self._name, result="memory_hit").inc()
+                return value
+            del self._entries[key]
+
+        if self._db_path:
+            row = await asyncio.to_thread(self._load, key)
+            if row is not None:
+                value = self._model.model_validate_json(row[0])
+                self._remember(key, value, row[1])
+                CACHE_REQUESTS.labels(cache=self._name, result="disk_hit").inc()
+                return value
+
+        CACHE_REQUESTS.labels(cache=self._name, result="miss").inc()
+        return None
+
+    async def set(self, key: str, value: M) -> None:
+        """Сохраняет результат в кэш.
+
+        Args:
+            key: Ключ кэша
+            value: Результат
+        """
+        expires_at = time.time() + self._ttl
+        self._remember(key, value, expires_at)
+        if self._db_path:
+            await asyncio.to_thread(
+                self._store, key, value.model_dump_json(), expires_at
+            )
+
+    def _remember(self, key: str, value: M, expires_at: float) -> None:
+        """Кладёт запись в память, вытесняя самые старые по LRU."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[tuple[str, float]]:
+        """Читает неистёкшую запись из SQLite."""
+        with closing(sqlite3.connect(self._db_path)) as conn:
+            return conn.execute(
+                "SELECT value, expires_at FROM results "
+                "WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self._name, key, time.time()),
+            ).fetchone()
+
+    def _store(self, key: str, value: str, expires_at: float) -> None:
+        """Записывает запись в SQLite."""
+        with closing(sqlite3.connect(self._db_path)) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (namespace, key, value, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self._name, key, value, expires_at),
+            )
@@ -1,28 +1,48 @@
+import asyncio
+import itertools
 import logging
 import time
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    TypeVar,
+    Union,
+)
 from uuid import uuid4
 
 from routers.schemas import (
+    EducationInfo,
     FinalResponse,
+    HigherEducation,
     SelectionContext,
     SelectionResults,
 )
 from service.document_service import DocumentService, DocumentValidationError
 from service.llm_service import LLMService
+from service.metrics import observe_stage
 from service.resume_text_converter import ResumeTextConverter
+from service.timings import StageTimings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SelectionService:
     """Оркестратор пайплайна отбора кандидата в студенческий резерв.
 
     Координирует проверку резюме и верификацию документов об образовании.
+    Модерация резюме и проверки всех дипломов выполняются параллельно,
+    не более concurrency LLM-вызовов одновременно.
 
     Args:
         document_service: Сервис работы с файлами
         llm_service: Сервис взаимодействия с LLM/VLM
         resume_text_converter: Конвертер резюме в текст
+        concurrency: Максимум одновременных LLM-вызовов на один отбор
 
     Example:
         service = SelectionService(document_service, llm_service, resume_text_converter)
@@ -34,16 +54,27 @@ class SelectionService:
         document_service: DocumentService,
         llm_service: LLMService,
         resume_text_converter: ResumeTextConverter,
+        concurrency: int = 4,
     ) -> None:
         self._document_service = document_service
         self._llm_service = llm_service
         self._resume_text_converter = resume_text_converter
+        self._concurrency = max(1, concurrency)
 
-    async def run(self, context: SelectionContext) -> FinalResponse:
+    async def run(
+        self,
+        context: SelectionContext,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        timings: Optional[StageTimings] = None,
+    ) -> FinalResponse:
         """Запускает полный цикл отбора кандидата.
 
         Args:
             context: Контекст отбора (резюме, правила, файлы дипломов)
+            semaphore: Общий семафор LLM-вызовов (для пакетного отбора);
+                по умолчанию — собственный семафор на concurrency вызовов
+            timings: Сборщик длительностей этапов; если передан, разбивка
+                времени попадает в FinalResponse.timings
 
         Returns:
             FinalResponse: Полный результат проверки
@@ -54,34 +85,48 @@ class SelectionService:
         trace = uuid4()
         start_time = time.perf_counter()
 
+        await self.check_documents(context)
         higher_educations = context.resume.education.higherEducation
-        for edu in higher_educations:
-            if edu.educationFilename and not self._document_service.exists(
-                edu.educationFilename
-            ):
-                raise DocumentValidationError(
-                    f"Файл диплома не найден: {edu.educationFilename}"
-                )
 
         resume_text = self._resume_text_converter.convert(context.resume)
+        documents = [edu for edu in higher_educations if edu.educationFilename]
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._concurrency)
 
-        moderation_result = await self._llm_service.moderate_resume(
-            resume_text=resume_text,
-            rules=context.rules,
-        )
+        collector = timings if timings is not None else StageTimings()
+        items = [collector.child(edu.educationFilename) for edu in documents]
 
-        education_info = []
-        for edu in higher_educations:
-            if not edu.educationFilename:
-                continue
-            file_path = self._document_service.get_path(edu.educationFilename)
-            info = await self._llm_service.check_education(
-                edu=edu,
-                file_path=file_path,
-                resume_fullname=context.resume.fullname,
-            )
-            education_info.append(info)
-            self._document_service.delete(edu.educationFilename)
+        try:
+            with collector.activate():
+                async with asyncio.TaskGroup() as tg:
+                    moderation_task = tg.create_task(
+                        self._limited(
+                            semaphore,
+                            lambda: self._llm_service.moderate_resume(
+                                resume_text=resume_text,
+                                rules=context.rules,
+                            ),
+                        )
+                    )
+                    education_tasks = [
+                        tg.create_task(
+                            self._limited(
+                                semaphore,
+                                lambda edu=edu, item=item: self._check_education(
+                                    edu, context.resume.fullname, item
+                                ),
+                            )
+                        )
+                        for edu, item in zip(documents, items)
+                    ]
+        except ExceptionGroup as eg:
+            # TaskGroup уже отменил остальные ветки — наружу отдаём первую ошибку
+            raise eg.exceptions[0] from eg
+
+        moderation_result = moderation_task.result()
+        education_info = [task.result() for task in education_tasks]
+        for edu in documents:
+            await self._document_service.delete(edu.educationFilename)
 
         time_ms = int((time.perf_counter() - start_time) * 1000)
 
@@ -108,4 +153,145 @@ class SelectionService:
                 overallSuccess=overall_success,
             ),
             timeMs=time_ms,
+            timings=collector.to_schema(str(trace)) if timings is not None else None,
         )
+
+    async def run_batch(
+        self,
+        contexts: Iterable[SelectionContext],
+        concurrency: int,
+        include_timings: bool = False,
+    ) -> AsyncIterator[tuple[int, Union[FinalResponse, Exception]]]:
+        """Выполняет пакетный отбор, отдавая результаты по мере готовности.
+
+        LLM-вызовы всех кандидатов идут через один общий семафор на
+        concurrency вызовов. Одновременно обрабатывается не больше
+        concurrency кандидатов, поэтому первые результаты приходят
+        сразу, а не после постановки в очередь всего пакета.
+
+        Args:
+            contexts: Контексты отбора
+            concurrency: Максимум одновременных LLM-вызовов на весь пакет
+            include_timings: Добавлять разбивку времени в каждый FinalResponse
+
+        Yields:
+            tuple[int, FinalResponse | Exception]: Индекс контекста и результат
+                отбора или ошибка, с которой он завершился
+        """
+        concurrency = max(1, concurrency)
+        semaphore = asyncio.Semaphore(concurrency)
+        items = enumerate(contexts)
+        pending = {
+            asyncio.create_task(
+                self._run_item(index, context, semaphore, include_timings)
+            )
+            for index, context in itertools.islice(items, concurrency)
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+                    for index, context in itertools.islice(items, 1):
+                        pending.add(
+                            asyncio.create_task(
+                                self._run_item(
+                                    index, context, semaphore, include_timings
+                                )
+                            )
+                        )
+        finally:
+            # Клиент отключился — незавершённые отборы больше не нужны
+            for task in pending:
+                task.cancel()
+
+    async def _run_item(
+        self,
+        index: int,
+        context: SelectionContext,
+        semaphore: asyncio.Semaphore,
+        include_timings: bool,
+    ) -> tuple[int, Union[FinalResponse, Exception]]:
+        """Выполняет один отбор пакета, превращая ошибку в результат.
+
+        Args:
+            index: Индекс контекста в пакете
+            context: Контекст отбора
+            semaphore: Общий семафор LLM-вызовов пакета
+            include_timings: Добавлять разбивку времени в FinalResponse
+
+        Returns:
+            tuple[int, FinalResponse | Exception]: Индекс и результат или ошибка
+        """
+        try:
+            timings = StageTimings() if include_timings else None
+            return index, await self.run(context, semaphore, timings)
+        except DocumentValidationError as e:
+            return index, e
+        except Exception as e:
+            logger.error(
+                "Batch selection item failed", exc_info=True, extra={"index": index}
+            )
+            return index, e
+
+    async def _check_education(
+        self, edu: HigherEducation, resume_fullname: str, timings: StageTimings
+    ) -> EducationInfo:
+        """Проверяет одну запись об образовании, собирая её длительности этапов.
+
+        Args:
+            edu: Запись о высшем образовании с загруженным документом
+            resume_fullname: ФИО из анкеты
+            timings: Сборщик длительностей этой записи
+
+        Returns:
+            EducationInfo: Результат проверки записи
+        """
+        document_id = await self._document_service.resolve(edu.educationFilename)
+        with timings.activate():
+            return await self._llm_service.check_education(
+                edu=edu,
+                file_path=self._document_service.path(document_id),
+                resume_fullname=resume_fullname,
+                document_id=document_id,
+            )
+
+    async def check_documents(self, context: SelectionContext) -> None:
+        """Проверяет, что все указанные в резюме документы загружены.
+
+        Args:
+            context: Контекст отбора
+
+        Raises:
+            DocumentValidationError: Если файл диплома не найден
+        """
+        for edu in context.resume.education.higherEducation:
+            if edu.educationFilename and not await self._document_service.exists(
+                edu.educationFilename
+            ):
+                raise DocumentValidationError(
+                    f"Файл диплома не найден: {edu.educationFilename}"
+                )
+
+    @staticmethod
+    async def _limited(
+        semaphore: asyncio.Semaphore, call: Callable[[], Awaitable[T]]
+    ) -> T:
+        """Выполняет LLM-вызов под общим семафором отбора.
+
+        Корутина создаётся только после захвата семафора, поэтому отменённые
+        до старта ветки не оставляют неожиданных корутин.
+
+        Args:
+            semaphore: Семафор, ограничивающий число одновременных вызовов
+            call: Фабрика корутины LLM-вызова
+
+        Returns:
+            Результат вызова
+        """
+        start = time.perf_counter()
+        async with semaphore:
+            observe_stage("llm_slot_wait", time.perf_counter() - start)
+            return await call()
@@ -0,0 +1,179 @@
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+
+_CODE_RE = re.compile(r"\b\d{2}\.\d{2}\.\d{2}(?:\.\d{2})?\b")
+_NON_WORD_RE = re.compile(r"[^0-9a-zа-я]+")
+
+
+def normalize_specialty(text: str) -> str:
+    """Нормализует название специальности для сравнения.
+
+    Приводит к нижнему регистру, заменяет ё на е и схлопывает
+    пунктуацию и пробельные символы в одиночные пробелы.
+
+    Args:
+        text: Название специальности
+
+    Returns:
+        str: Нормализованное название
+    """
+    text = text.lower().replace("ё", "е")
+    return _NON_WORD_RE.sub(" ", text).strip()
+
+
+def _ngrams(text: str, n: int) -> list[str]:
+    """Символьные n-граммы нормализованного текста с границами слов."""
+    padded = f" {text} "
+    return [padded[i : i + n] for i in range(len(padded) - n + 1)]
+
+
+class SpecialtyIndex:
+    """Индекс по классификатору специальностей.
+
+    Строится один раз при старте:
+    - для подбора кандидатов каждое название классификатора представляется
+      L2-нормированным вектором символьных n-грамм, запрос оценивается
+      косинусной близостью одним матричным умножением NumPy;
+    - для нормализации ответа VLM хранятся словарь нормализованное
+      название -> коды и frozenset нормализованных допустимых названий,
+      так что проверка специальности не зависит от регистра, ё/е и пробелов.
+
+    Args:
+        specialties: Классификатор специальностей (код -> название)
+        required: Перечень допустимых специальностей
+        ngram: Длина символьных n-грамм
+
+    Example:
+        index = SpecialtyIndex(uni_spec, required_specialties)
+        codes = index.shortlist("09.03.04 Программная инженерия", top_k=10, min_score=0.45)
+        text = index.render(codes)  # None в codes -> полный список
+        code, name = index.canonicalize("09.03.04", "программная  инженерия")
+        index.is_required(name)  # True
+    """
+
+    def __init__(
+        self, specialties: dict[str, str], required: Iterable[str], ngram: int = 3
+    ) -> None:
+        self._specialties = specialties
+        self._codes = list(specialties)
+        self._ngram = ngram
+        self._full_text = self.render(self._codes)
+
+        self._codes_by_name: dict[str, list[str]] = {}
+        for code, name in specialties.items():
+            self._codes_by_name.setdefault(normalize_specialty(name), []).append(code)
+        self._required = frozenset(normalize_specialty(name) for name in required)
+
+        vocabulary: dict[str, int] = {}
+        rows = []
+        for code in self._codes:
+            grams = _ngrams(normalize_specialty(specialties[code]), ngram)
+            rows.append([vocabulary.setdefault(g, len(vocabulary)) for g in grams])
+        self._vocabulary = vocabulary
+
+        matrix = np.zeros((len(self._codes), len(vocabulary)), dtype=np.float32)
+        for i, columns in enumerate(rows):
+            np.add.at(matrix[i], columns, 1.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.maximum(norms, 1e-9)
+
+    @property
+    def full_text(self) -> str:
+        """Полный список специальностей в формате промпта."""
+        return self._full_text
+
+    def shortlist(
+        self, query: str, top_k: int, min_score: float
+    ) -> Optional[list[str]]:
+        """Подбирает коды специальностей-кандидатов для записи из анкеты.
+
+        Коды, явно указанные в запросе и присутствующие в классификаторе,
+        идут первыми; затем top_k наиболее похожих названий.
+
+        Args:
+            query: Специальность из анкеты (может содержать код)
+            top_k: Число кандидатов по названию
+            min_score: Минимальная косинусная близость лучшего кандидата
+
+        Returns:
+            Optional[list[str]]: Коды кандидатов или None, если уверенность
+                низкая и нужно использовать полный список
+        """
+        explicit = [
+            code for code in _CODE_RE.findall(query) if code in self._specialties
+        ]
+        scores = self._scores(_CODE_RE.sub(" ", query))
+        if scores is None or scores.max() < min_score:
+            return explicit or None
+
+        top_k = min(top_k, len(self._codes))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        candidates = explicit + [self._codes[i] for i in top]
+        return list(dict.fromkeys(candidates))
+
+    def canonicalize(
+        self, code: Optional[str], name: Optional[str]
+    ) -> tuple[Optional[str], Optional[str]]:
+        """Приводит код и название специальности из ответа VLM к записи классификатора.
+
+        Название приоритетнее кода: если нормализованное название есть
+        в классификаторе, берётся его код (указанный код — если он среди
+        кодов этого названия). Иначе код из классификатора даёт
+        каноническое название. Если не найдено ни то, ни другое —
+        значения возвращаются без изменений.
+
+        Args:
+            code: Код специальности из ответа VLM
+            name: Название специальности из ответа VLM
+
+        Returns:
+            tuple[Optional[str], Optional[str]]: Канонические код и название
+        """
+        code = "".join(code.split()) if code else code
+        if name:
+            codes = self._codes_by_name.get(normalize_specialty(name))
+            if codes:
+                resolved = code if code in codes else codes[0]
+                return resolved, self._specialties[resolved]
+        if code in self._specialties:
+            return code, self._specialties[code]
+        return code, name
+
+    def is_required(self, name: Optional[str]) -> bool:
+        """Проверяет, входит ли специальность в перечень допустимых.
+
+        Args:
+            name: Название специальности
+
+        Returns:
+            bool: True если нормализованное название есть в перечне
+        """
+        return name is not None and normalize_specialty(name) in self._required
+
+    def render(self, codes: Optional[list[str]]) -> str:
+        """Форматирует коды в строки "код: название" для промпта.
+
+        Args:
+            codes: Коды специальностей; None — полный список
+
+        Returns:
+            str: Список специальностей
+        """
+        if codes is None:
+            return self._full_text
+        return "\n".join(f"{code}: {self._specialties[code]}" for code in codes)
+
+    def _scores(self, text: str) -> Optional[np.ndarray]:
+        """Косинусная близость запроса ко всем названиям классификатора."""
+        grams = _ngrams(normalize_specialty(text), self._ngram)
+        columns = [self._vocabulary[g] for g in grams if g in self._vocabulary]
+        if not columns:
+            return None
+        vector = np.zeros(len(self._vocabulary), dtype=np.float32)
+        np.add.at(vector, columns, 1.0)
+        # n-граммы запроса вне словаря тоже уменьшают близость
+        norm = np.sqrt(np.dot(vector, vector) + len(grams) - len(columns))
+        return self._matrix @ (vector / norm)
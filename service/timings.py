@@ -0,0 +1,124 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from routers.schemas import EducationTiming, SelectionTimings
+
+_current: ContextVar[Optional["StageTimings"]] = ContextVar(
+    "stage_timings", default=None
+)
+
+
+class StageTimings:
+    """Сборщик длительностей этапов одного отбора.
+
+    Активируется через contextvars, поэтому этапы, измеренные в глубине
+    сервисов (track_stage, observe_stage), попадают в сборщик текущего
+    отбора без передачи его через аргументы. Задачи TaskGroup наследуют
+    контекст, в котором были созданы. Длительности одного этапа
+    суммируются; дочерний сборщик (запись об образовании) дублирует свои
+    этапы в родительский.
+
+    Args:
+        name: Название (для записи об образовании — educationFilename)
+        queue_wait: Время ожидания в очереди заданий в секундах
+        parent: Родительский сборщик
+
+    Example:
+        timings = StageTimings()
+        with timings.activate():
+            await llm_service.moderate_resume(...)
+        timings.stages_ms  # {"moderate_resume": 2140, "json_extraction": 1}
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        queue_wait: Optional[float] = None,
+        parent: Optional["StageTimings"] = None,
+    ) -> None:
+        self.name = name
+        self.queue_wait = queue_wait
+        self.total: Optional[float] = None
+        self._parent = parent
+        self._stages: dict[str, float] = defaultdict(float)
+        self._children: list["StageTimings"] = []
+
+    @property
+    def stages_ms(self) -> dict[str, int]:
+        """Длительности этапов в миллисекундах."""
+        return {stage: int(s * 1000) for stage, s in self._stages.items()}
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Добавляет длительность этапа.
+
+        Args:
+            stage: Название этапа
+            seconds: Длительность в секундах
+        """
+        self._stages[stage] += seconds
+        if self._parent is not None:
+            self._parent.record(stage, seconds)
+
+    def child(self, name: str) -> "StageTimings":
+        """Создаёт дочерний сборщик (например, для записи об образовании).
+
+        Args:
+            name: Название дочернего сборщика
+
+        Returns:
+            StageTimings: Дочерний сборщик
+        """
+        child = StageTimings(name, parent=self)
+        self._children.append(child)
+        return child
+
+    @contextmanager
+    def activate(self) -> Iterator["StageTimings"]:
+        """Делает сборщик текущим и измеряет общее время блока."""
+        token = _current.set(self)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.total = time.perf_counter() - start
+            _current.reset(token)
+
+    def to_schema(self, trace: str) -> SelectionTimings:
+        """Собирает разбивку времени для FinalResponse.
+
+        Args:
+            trace: Идентификатор трассировки отбора
+
+        Returns:
+            SelectionTimings: Разбивка по этапам и записям об образовании
+        """
+        return SelectionTimings(
+            trace=trace,
+            queueWaitMs=(
+                int(self.queue_wait * 1000) if self.queue_wait is not None else None
+            ),
+            stagesMs=self.stages_ms,
+            education=[
+                EducationTiming(
+                    educationFilename=child.name,
+                    timeMs=int((child.total or 0) * 1000),
+                    stagesMs=child.stages_ms,
+                )
+                for child in self._children
+            ],
+        )
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Добавляет длительность этапа в сборщик текущего отбора, если он активен.
+
+    Args:
+        stage: Название этапа
+        seconds: Длительность в секундах
+    """
+    timings = _current.get()
+    if timings is not None:
+        timings.record(stage, seconds)
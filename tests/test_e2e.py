@@ -1,3 +1,6 @@
+import glob
+import json
+import os
 import subprocess
 import time
 from typing import Generator
@@ -172,6 +175,21 @@ def test_upload_returns_filename(app_server):
     print(f"\n✓ Uploaded: {filename}")
 
 
+def test_upload_same_content_shares_document(app_server):
+    """Повторная загрузка того же содержимого получает свой идентификатор,
+    но хранится одним файлом."""
+    first, second = upload_diploma(), upload_diploma()
+    content_hash = first.split("-")[0]
+
+    assert first != second
+    assert second.split("-")[0] == content_hash
+    stored = glob.glob(
+        os.path.join(get_settings().storage_dir, "**", f"{content_hash}.pdf"),
+        recursive=True,
+    )
+    assert len(stored) == 1
+
+
 def test_upload_rejects_non_pdf(app_server):
     """Загрузка не-PDF возвращает 422."""
     resp = requests.post(
@@ -254,3 +272,82 @@ def test_selection_missing_file_returns_422(app_server):
     )
     assert resp.status_code == 422
     print("\n✓ Missing file → 422 as expected")
+
+
+def test_selection_job_missing_file_returns_422(app_server):
+    """Постановка задания с несуществующим файлом диплома → 422."""
+    resume = {**RESUME}
+    resume["education"] = {
+        **RESUME["education"],
+        "higherEducation": [
+            {
+                **RESUME["education"]["higherEducation"][0],
+                "educationFilename": "nonexistent.pdf",
+            }
+        ],
+    }
+    body = {"rules": RULES, "resume": resume}
+    resp = requests.post(
+        f"{BASE_URL}/moderator/reserve/selection/jobs", json=body, timeout=30
+    )
+    assert resp.status_code == 422
+
+
+def test_selection_job_unknown_returns_404(app_server):
+    """Запрос несуществующего задания → 404."""
+    resp = requests.get(
+        f"{BASE_URL}/moderator/reserve/selection/jobs/unknown", timeout=10
+    )
+    assert resp.status_code == 404
+
+
+def test_selection_batch_streams_items_and_summary(app_server):
+    """Пакетный отбор: строка на каждого кандидата и итоговая строка."""
+    resume = {**RESUME}
+    resume["education"] = {
+        **RESUME["education"],
+        "higherEducation": [
+            {
+                **RESUME["education"]["higherEducation"][0],
+                "educationFilename": "nonexistent.pdf",
+            }
+        ],
+    }
+    body = [{"rules": RULES, "resume": resume}] * 2
+    resp = requests.post(
+        f"{BASE_URL}/moderator/reserve/selection/batch", json=body, timeout=30
+    )
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in resp.text.splitlines() if line]
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1]
+    assert all(line["error"] for line in lines[:-1])
+    assert lines[-1]["summary"]["total"] == 2
+    assert lines[-1]["summary"]["failed"] == 2
+
+
+def test_metrics_exposes_stage_histograms(app_server):
+    """/metrics отдаёт метрики Prometheus с длительностями этапов."""
+    upload_diploma()
+    resp = requests.get(f"{BASE_URL}/metrics", timeout=10)
+    assert resp.status_code == 200
+    assert 'moderator_stage_duration_seconds_count{stage="upload_read"}' in resp.text
+
+
+def test_selection_timings_opt_in(app_server):
+    """Разбивка времени возвращается только по флагу ?timings=true."""
+    resume = {**RESUME}
+    resume["education"] = {
+        **RESUME["education"],
+        "higherEducation": [
+            {**RESUME["education"]["higherEducation"][0], "educationFilename": None}
+        ],
+    }
+    body = {"rules": RULES, "resume": resume}
+    resp = requests.post(
+        f"{BASE_URL}/moderator/reserve/selection?timings=true", json=body, timeout=120
+    )
+    assert resp.status_code == 200
+    timings = resp.json()["timings"]
+    assert timings["trace"]
+    assert "moderate_resume" in timings["stagesMs"]
+    assert timings["education"] == []
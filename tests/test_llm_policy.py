@@ -0,0 +1,243 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError
+
+from service.llm_policy import LLMCallPolicy
+from service.llm_router import CircuitBreaker, LLMBackend, LLMRouter
+
+REQUEST = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+
+
+class FakeClient:
+    """Клиент реплики: отдаёт заранее заданные исходы по очереди.
+
+    Исход — значение ответа, исключение или задержка в секундах (float),
+    после которой возвращается "slow".
+    """
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.cancelled = False
+
+    async def create(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if isinstance(outcome, float):
+            try:
+                await asyncio.sleep(outcome)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
+            return "slow"
+        return outcome
+
+
+def backend(name: str, client=None, weight: float = 1.0, threshold: int = 5):
+    return LLMBackend(
+        name,
+        client or FakeClient(),
+        weight,
+        CircuitBreaker(name, failure_threshold=threshold, reset_timeout=30),
+    )
+
+
+def policy(backends, hedge: bool = False, max_retries: int = 2) -> LLMCallPolicy:
+    router = LLMRouter(backends, sticky=False, health_interval=0, health_timeout=1)
+    return LLMCallPolicy(
+        router,
+        timeout=5,
+        stage_timeouts={},
+        max_retries=max_retries,
+        backoff_base=0,
+        backoff_max=0,
+        hedge=hedge,
+        hedge_min_delay=0.01,
+    )
+
+
+def connection_error() -> APIConnectionError:
+    return APIConnectionError(request=REQUEST)
+
+
+def test_breaker_open_half_open_closed():
+    breaker = CircuitBreaker("test-breaker", failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # пробный запрос уже идёт
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_rejects_until_reset_timeout():
+    breaker = CircuitBreaker("test-breaker-wait", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert not breaker.available()
+    assert not breaker.allow()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_error():
+    client = FakeClient(connection_error(), "answer")
+    replica = backend("retry", client)
+
+    result = await policy([replica]).call("test", lambda c: c.create())
+
+    assert result == "answer"
+    assert client.calls == 2
+    assert replica.outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_reraises_non_transient_error_immediately():
+    client = FakeClient(ValueError("bad request"))
+    replica = backend("no-retry", client, threshold=1)
+
+    with pytest.raises(ValueError):
+        await policy([replica]).call("test", lambda c: c.create())
+
+    assert client.calls == 1
+    assert replica.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_local_protocol_error_is_not_retried():
+    error = connection_error()
+    error.__cause__ = httpx.LocalProtocolError("Illegal header value b'Bearer '")
+    client = FakeClient(error)
+    replica = backend("local-error", client, threshold=1)
+
+    with pytest.raises(APIConnectionError):
+        await policy([replica]).call("test", lambda c: c.create())
+
+    assert client.calls == 1
+    assert replica.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_hedge_winner_cancels_loser():
+    slow = FakeClient(5.0)
+    fast = FakeClient("fast")
+    backends = [backend("hedge-slow", slow), backend("hedge-fast", fast)]
+    calls = policy(backends, hedge=True)
+    for _ in range(20):
+        calls._observe("test", 0.01)
+
+    result = await calls.call("test", lambda c: c.create())
+    # отменённый запрос снимает резерв нагрузки в done-callback задачи
+    await asyncio.sleep(0.01)
+
+    assert result == "fast"
+    assert slow.cancelled
+    assert [b.outstanding for b in backends] == [0, 0]
+
+
+def test_least_load_spreads_by_weight():
+    light = backend("least-light", weight=1)
+    heavy = backend("least-heavy", weight=2)
+    router = LLMRouter(
+        [light, heavy], sticky=False, health_interval=0, health_timeout=1
+    )
+
+    chosen = [router.acquire(1.0).name for _ in range(6)]
+
+    assert chosen.count("least-heavy") == 4
+    assert chosen.count("least-light") == 2
+
+
+def test_sticky_keeps_affinity_until_overloaded():
+    backends = [backend(f"sticky-{i}") for i in range(3)]
+    router = LLMRouter(backends, sticky=True, health_interval=0, health_timeout=1)
+
+    first = router.acquire(1.0, affinity="prefix")
+    router.release(first, 1.0)
+    for _ in range(5):
+        chosen = router.acquire(1.0, affinity="prefix")
+        router.release(chosen, 1.0)
+        assert chosen is first
+
+    # реплика с префиксом загружена сильнее остальных больше чем на стоимость
+    first.outstanding = 3.0
+    assert router.acquire(1.0, affinity="prefix") is not first
+
+
+def test_exclude_prefers_another_backend():
+    first, second = backend("exclude-1"), backend("exclude-2")
+    router = LLMRouter(
+        [first, second], sticky=False, health_interval=0, health_timeout=1
+    )
+
+    assert router.acquire(1.0, exclude=first) is second
+
+    second.healthy = False
+    assert router.acquire(1.0, exclude=first) is first
+
+
+class FlakyModels:
+    """Эндпоинт /models реплики, который отвечает или падает по флагу."""
+
+    def __init__(self) -> None:
+        self.up = True
+
+    async def list(self, timeout: float):
+        if not self.up:
+            raise connection_error()
+
+
+@pytest.mark.asyncio
+async def test_health_requires_consecutive_failures():
+    client = FakeClient()
+    client.models = FlakyModels()
+    flaky, steady = backend("health-flaky", client), backend("health-steady")
+    steady.client.models = FlakyModels()
+    router = LLMRouter(
+        [flaky, steady],
+        sticky=False,
+        health_interval=0,
+        health_timeout=1,
+        health_failures=2,
+    )
+
+    client.models.up = False
+    await router.check_health()
+    assert flaky.healthy
+    await router.check_health()
+    assert not flaky.healthy
+
+    client.models.up = True
+    await router.check_health()
+    assert flaky.healthy
+
+
+def test_unhealthy_backends_used_when_none_healthy():
+    first, second = backend("fallback-1"), backend("fallback-2")
+    router = LLMRouter(
+        [first, second], sticky=False, health_interval=0, health_timeout=1
+    )
+    first.healthy = second.healthy = False
+
+    assert router.acquire(1.0) in (first, second)
+
+
+def test_health_checks_skipped_for_single_backend():
+    router = LLMRouter(
+        [backend("single")], sticky=False, health_interval=15, health_timeout=1
+    )
+    router.start()
+    assert router._health_task is None
@@ -0,0 +1,128 @@
+import zlib
+from pathlib import Path
+
+import pytest
+
+from service.pdf_validator import PdfCheckStatus, validate_pdf
+
+CATALOG = b"<< /Type /Catalog /Pages 2 0 R >>"
+PAGE = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>"
+
+
+def pages(count: int) -> bytes:
+    kids = b"[3 0 R]" if count else b"[]"
+    return b"<< /Type /Pages /Kids " + kids + b" /Count %d >>" % count
+
+
+def classic_pdf(objects: list[bytes], trailer: bytes = b"") -> bytes:
+    """Собирает PDF с классической таблицей xref; объекты нумеруются с 1."""
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R %s>>\n" % (len(objects) + 1, trailer)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
+
+
+def xref_stream_pdf() -> bytes:
+    """Собирает PDF 1.5: каталог и страницы в /ObjStm, таблица — поток /XRef."""
+    out = bytearray(b"%PDF-1.5\n")
+    compressed = [CATALOG, pages(1), PAGE]
+    body = b""
+    header = b""
+    for num, obj in enumerate(compressed, start=1):
+        header += b"%d %d " % (num, len(body))
+        body += obj + b"\n"
+    content = zlib.compress(header + body)
+    objstm_offset = len(out)
+    out += b"4 0 obj\n<< /Type /ObjStm /N 3 /First %d /Filter /FlateDecode " % len(
+        header
+    )
+    out += b"/Length %d >>\nstream\n%s\nendstream\nendobj\n" % (len(content), content)
+
+    xref_offset = len(out)
+    rows = b"\x00\x00\x00\xff"
+    rows += b"".join(b"\x02\x00\x04" + bytes([i]) for i in range(3))
+    rows += b"\x01" + objstm_offset.to_bytes(2, "big") + b"\x00"
+    rows += b"\x01" + xref_offset.to_bytes(2, "big") + b"\x00"
+    data = zlib.compress(rows)
+    out += (
+        b"5 0 obj\n<< /Type /XRef /Size 6 /W [1 2 1] /Root 1 0 R "
+        b"/Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream\nendobj\n"
+        % (len(data), data)
+    )
+    out += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+    return bytes(out)
+
+
+def check(tmp_path: Path, content: bytes):
+    path = tmp_path / "document.pdf"
+    path.write_bytes(content)
+    return validate_pdf(str(path))
+
+
+def test_classic_xref_is_valid(tmp_path):
+    result = check(tmp_path, classic_pdf([CATALOG, pages(1), PAGE]))
+    assert result.status == PdfCheckStatus.Valid
+    assert result.page_count == 1
+
+
+def test_xref_stream_with_object_stream_is_valid(tmp_path):
+    result = check(tmp_path, xref_stream_pdf())
+    assert result.status == PdfCheckStatus.Valid
+    assert result.page_count == 1
+
+
+def test_sample_diploma_is_valid():
+    result = validate_pdf(str(Path(__file__).parent / "test_diploma.pdf"))
+    assert result.status == PdfCheckStatus.Valid
+
+
+def test_encrypted_is_inconclusive(tmp_path):
+    content = classic_pdf(
+        [CATALOG, pages(1), PAGE, b"<< /Filter /Standard /V 2 >>"],
+        trailer=b"/Encrypt 4 0 R ",
+    )
+    result = check(tmp_path, content)
+    assert result.status == PdfCheckStatus.Inconclusive
+    assert result.encrypted
+
+
+def test_truncated_is_inconclusive(tmp_path):
+    content = classic_pdf([CATALOG, pages(1), PAGE])
+    result = check(tmp_path, content[: len(content) // 2])
+    assert result.status == PdfCheckStatus.Inconclusive
+
+
+def test_zero_pages_is_invalid(tmp_path):
+    result = check(tmp_path, classic_pdf([CATALOG, pages(0)]))
+    assert result.status == PdfCheckStatus.Invalid
+    assert result.page_count == 0
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8, b"not a pdf at all"],
+    ids=["empty", "png", "text"],
+)
+def test_garbage_is_invalid(tmp_path, content):
+    assert check(tmp_path, content).status == PdfCheckStatus.Invalid
+
+
+def test_decompression_bomb_is_inconclusive(tmp_path):
+    bomb = zlib.compress(bytes(64 * 1024 * 1024), 9)
+    content = (
+        b"%%PDF-1.5\n1 0 obj\n<< /Type /XRef /Size 2 /W [1 2 1] /Root 1 0 R "
+        b"/Filter /FlateDecode /DecodeParms << /Predictor 12 /Columns 4 >> "
+        b"/Length %d >>\nstream\n%s\nendstream\nendobj\nstartxref\n9\n%%%%EOF\n"
+        % (len(bomb), bomb)
+    )
+    result = check(tmp_path, content)
+    assert result.status == PdfCheckStatus.Inconclusive
+    assert "too large" in result.reason
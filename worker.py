@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import signal
+
+from prometheus_client import start_http_server
+
+from configs.settings import get_settings
+from service.document_service import DocumentService
+from service.job_queue import JobQueue
+from service.job_worker import JobWorker
+from service.llm_service import LLMService
+from service.render_service import RenderService
+from service.resume_text_converter import ResumeTextConverter
+from service.selection_service import SelectionService
+
+logging.basicConfig(
+    level=logging.DEBUG,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logging.getLogger("httpcore").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("openai").setLevel(logging.WARNING)
+
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def main() -> None:
+    """Запускает воркер очереди заданий отбора.
+
+    Инициализирует сервисы так же, как API, и разбирает очередь до SIGTERM/SIGINT.
+    Метрики Prometheus воркера отдаются на worker_metrics_port (0 — отключено).
+    Начатые задания доводятся до конца перед выходом.
+    """
+    if settings.worker_metrics_port:
+        start_http_server(settings.worker_metrics_port)
+    render_service = RenderService(settings)
+    llm_service = LLMService(settings, render_service)
+    try:
+        document_service = DocumentService(settings, render_service)
+        selection_service = SelectionService(
+            document_service,
+            llm_service,
+            ResumeTextConverter(),
+            concurrency=settings.selection_concurrency,
+        )
+        worker = JobWorker(
+            JobQueue(
+                settings.job_queue_path,
+                lease_timeout=settings.job_lease_timeout,
+                max_attempts=settings.job_max_attempts,
+            ),
+            selection_service,
+            concurrency=settings.job_worker_concurrency,
+            poll_interval=settings.job_poll_interval,
+            retention=settings.job_retention,
+        )
+        llm_service.start_health_checks()
+        if settings.llm_warmup:
+            llm_service.start_warm_up()
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, worker.stop)
+
+        await worker.run()
+    finally:
+        await llm_service.aclose()
+        render_service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())